@@ -12,6 +12,7 @@ import sys
 import subprocess
 import platform
 import logging
+from functools import lru_cache
 from pathlib import Path
 
 # Configure logging
@@ -48,30 +49,44 @@ def check_python_version():
         logger.info(f"Python {version.major}.{version.minor} detected - Compatible ✓")
         return True
 
-def run_pip_install(package):
-    """Run pip install with proper error handling"""
+def run_pip_install(*packages):
+    """Run a single pip install for one or more packages with proper error handling"""
+    package_list = ", ".join(packages)
     try:
         subprocess.run(
-            [sys.executable, "-m", "pip", "install", package],
+            [sys.executable, "-m", "pip", "install", *packages],
             check=True,
             capture_output=True,
             text=True
         )
-        logger.info(f"Successfully installed {package} ✓")
+        logger.info(f"Successfully installed {package_list} ✓")
         return True
     except subprocess.CalledProcessError as e:
-        logger.error(f"Failed to install {package}: {e.stderr}")
+        logger.error(f"Failed to install {package_list}: {e.stderr}")
         return False
 
+def install_packages(packages):
+    """
+    Install packages in one pip call, retrying one by one only on failure
+    
+    Returns:
+        list: Packages that could not be installed
+    """
+    logger.info(f"Installing {', '.join(packages)}...")
+    if run_pip_install(*packages):
+        return []
+    
+    # Batch install failed - retry individually to find the culprits
+    logger.info("Batch install failed, retrying packages individually...")
+    return [package for package in packages if not run_pip_install(package)]
+
 def install_dependencies():
     """Install required Python packages"""
     logger.info("Installing core dependencies...")
     
     # Core packages required for basic functionality
     core_packages = [
-        "PyPDF2>=3.0.0",
         "PyMuPDF>=1.20.0",
-        "python-docx>=0.8.11",
         "pandas>=1.3.0",
         "numpy>=1.21.0",
         "opencv-python>=4.5.0",
@@ -82,11 +97,7 @@ def install_dependencies():
         "streamlit>=1.10.0"
     ]
     
-    failed_packages = []
-    for package in core_packages:
-        logger.info(f"Installing {package}...")
-        if not run_pip_install(package):
-            failed_packages.append(package)
+    failed_packages = install_packages(core_packages)
     
     if failed_packages:
         logger.warning("Failed to install the following packages:")
@@ -96,32 +107,35 @@ def install_dependencies():
     else:
         logger.info("Core dependencies installed successfully ✓")
 
+@lru_cache(maxsize=1)
 def check_java():
-    """Check if Java is installed and configured"""
+    """Check if Java is installed and configured (cached; use check_java.cache_clear() to recheck)"""
     try:
+        # java -version prints to stderr, so fold it into stdout
         result = subprocess.run(
             ['java', '-version'],
-            capture_output=True,
-            text=True,
-            stderr=subprocess.STDOUT
+            stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT,
+            text=True
         )
         if 'version' in result.stdout:
             logger.info("Java is installed ✓")
             return True
-    except:
+    except (OSError, subprocess.SubprocessError):
         pass
     
     logger.warning("Java not found in PATH")
     return False
 
+@lru_cache(maxsize=1)
 def check_tesseract():
-    """Check if Tesseract is installed and configured"""
+    """Check if Tesseract is installed and configured (cached; use check_tesseract.cache_clear() to recheck)"""
     try:
         import pytesseract
         version = pytesseract.get_tesseract_version()
         logger.info(f"Tesseract version {version} found ✓")
         return True
-    except:
+    except Exception:
         logger.warning("Tesseract not found or not properly configured")
         return False
 
@@ -135,9 +149,7 @@ def setup_ocr():
         "pdf2image>=1.16.0"
     ]
     
-    for package in ocr_packages:
-        logger.info(f"Installing {package}...")
-        run_pip_install(package)
+    install_packages(ocr_packages)
     
     # Check system and provide appropriate instructions
     system = platform.system()
@@ -183,9 +195,7 @@ def setup_table_extraction():
         "tabula-py>=2.3.0"
     ]
     
-    for package in table_packages:
-        logger.info(f"Installing {package}...")
-        run_pip_install(package)
+    install_packages(table_packages)
     
     # Check Java installation
     if not check_java():
@@ -217,9 +227,7 @@ export JAVA_HOME=$(/usr/libexec/java_home)
 def create_requirements_file():
     """Create requirements.txt file"""
     requirements = [
-        "PyPDF2>=3.0.0",
         "PyMuPDF>=1.20.0",
-        "python-docx>=0.8.11",
         "pandas>=1.3.0",
         "numpy>=1.21.0",
         "opencv-python>=4.5.0",
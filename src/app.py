@@ -1,47 +1,51 @@
 import streamlit as st
-from pdf_processor import AdvancedPDFProcessor
-from report_analyzer import AdvancedReportAnalyzer
-from report_generator import HealthReportGenerator
-from visualization import VisualizationService
 import time
+from concurrent.futures import ThreadPoolExecutor, wait
 from datetime import datetime
+import os
 import logging
+from logging.handlers import RotatingFileHandler
 import traceback
-import matplotlib
-matplotlib.use('Agg')  # Use non-interactive backend
-import matplotlib.pyplot as plt
+from pathlib import Path
 import pandas as pd
 
 # Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.StreamHandler(),
-        logging.FileHandler("healthlens.log")
-    ]
-)
-logger = logging.getLogger("HealthLensAI")
+LOG_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+logging.basicConfig(level=logging.INFO, format=LOG_FORMAT)
 
-# Configure matplotlib style
-try:
-    plt.style.use('default')
-except Exception as e:
-    logger.warning(f"Could not set matplotlib style: {str(e)}")
+# Optional size-bounded log file, attached only once since Streamlit
+# re-executes this script on every rerun
+log_file = os.getenv("HEALTHLENS_LOG_FILE")
+root_logger = logging.getLogger()
+if log_file and not any(isinstance(h, RotatingFileHandler) for h in root_logger.handlers):
+    file_handler = RotatingFileHandler(log_file, maxBytes=5_000_000, backupCount=3, encoding='utf-8')
+    file_handler.setFormatter(logging.Formatter(LOG_FORMAT))
+    root_logger.addHandler(file_handler)
+
+logger = logging.getLogger("HealthLensAI")
 
 # Application version
 APP_VERSION = "2.0.0"
 
-# Set page configuration
-st.set_page_config(
-    page_title="HealthLens AI - Lab Report Interpreter",
-    page_icon="🩺",
-    layout="wide",
-    initial_sidebar_state="collapsed"
-)
+# Supported upload types and the AdvancedPDFProcessor method that extracts each
+TEXT_EXTRACTORS = {
+    "pdf": "extract_text_from_pdf",
+    "docx": "extract_text_from_docx",
+}
 
-# Apply custom CSS
-st.markdown("""
+# Display order for the severity chart
+SEVERITY_ORDER = ["Severe", "Moderate", "Mild", "None"]
+
+# Typical analysis duration, used to pace the progress bar
+EXPECTED_ANALYSIS_SECONDS = 8
+
+# Raw results table sizing: grid row height and the tallest the table may grow
+TABLE_ROW_HEIGHT = 35
+TABLE_MAX_HEIGHT = 400
+
+# Custom CSS, emitted on every rerun since Streamlit drops elements that
+# are not re-rendered
+APP_CSS = """
 <style>
     .main-header {
         font-size: 2.8rem;
@@ -125,7 +129,18 @@ st.markdown("""
         margin: 10px 0;
     }
 </style>
-""", unsafe_allow_html=True)
+"""
+
+# Set page configuration
+st.set_page_config(
+    page_title="HealthLens AI - Lab Report Interpreter",
+    page_icon="🩺",
+    layout="wide",
+    initial_sidebar_state="collapsed"
+)
+
+# Apply custom CSS
+st.markdown(APP_CSS, unsafe_allow_html=True)
 
 # Initialize session state
 if 'initialized' not in st.session_state:
@@ -165,61 +180,114 @@ if st.session_state.show_tutorial:
 # Main content area
 st.markdown('<div class="info-box">', unsafe_allow_html=True)
 
-# Patient information input
-col1, col2, col3 = st.columns(3)
-with col1:
-    patient_name = st.text_input("Patient Name", "")
-with col2:
-    patient_age = st.text_input("Age", "")
-    if patient_age and not patient_age.isdigit():
-        st.warning("Age should be a number")
-with col3:
-    patient_id = st.text_input("Patient ID", "")
+# Patient information input. Editing these fields only reruns this fragment
+# (st.fragment needs Streamlit 1.37+; older versions rerun the whole page).
+@getattr(st, "fragment", lambda func: func)
+def _patient_details():
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        st.text_input("Patient Name", key="patient_name")
+    with col2:
+        patient_age = st.text_input("Age", key="patient_age")
+        if patient_age and not patient_age.isdigit():
+            st.warning("Age should be a number")
+    with col3:
+        st.text_input("Patient ID", key="patient_id")
+
+_patient_details()
+patient_name = st.session_state.get("patient_name", "")
+patient_age = st.session_state.get("patient_age", "")
+patient_id = st.session_state.get("patient_id", "")
 
 # File upload
 uploaded_file = st.file_uploader(
     "Upload your lab report",
-    type=["pdf", "docx"],
+    type=list(TEXT_EXTRACTORS),
     help="We support PDF and Word document formats. Your data is processed securely."
 )
 st.markdown('</div>', unsafe_allow_html=True)
 
-# Initialize services with better error handling
-try:
-    pdf_processor = AdvancedPDFProcessor()
-    report_analyzer = AdvancedReportAnalyzer()
-    report_generator = HealthReportGenerator()
-    visualization_service = VisualizationService()
+# Initialize services once per process and reuse them across reruns.
+# The heavy service modules (and matplotlib) are only imported here so the
+# first page render does not wait on them.
+@st.cache_resource
+def _get_services():
+    import matplotlib
+    matplotlib.use('Agg')  # Use non-interactive backend
+    import matplotlib.pyplot as plt
+    from pdf_processor import AdvancedPDFProcessor
+    from report_analyzer import AdvancedReportAnalyzer
+    from report_generator import HealthReportGenerator
+    from visualization import VisualizationService
+    
+    # Configure matplotlib style
+    try:
+        plt.style.use('default')
+    except Exception as e:
+        logger.warning(f"Could not set matplotlib style: {str(e)}")
+    
+    services = (
+        AdvancedPDFProcessor(),
+        AdvancedReportAnalyzer(),
+        HealthReportGenerator(),
+        VisualizationService()
+    )
     logger.info("All services initialized successfully")
-except Exception as e:
-    logger.error(f"Error initializing services: {str(e)}")
-    # Create fallback services if needed
-    if 'pdf_processor' not in locals():
-        pdf_processor = AdvancedPDFProcessor()
-    if 'report_analyzer' not in locals():
-        report_analyzer = AdvancedReportAnalyzer()
-    if 'report_generator' not in locals():
-        report_generator = HealthReportGenerator()
-    if 'visualization_service' not in locals():
-        visualization_service = VisualizationService()
+    return services
+
+# Services are only needed once there is a document or a result to show
+if uploaded_file or st.session_state.processing_complete:
+    try:
+        pdf_processor, report_analyzer, report_generator, visualization_service = _get_services()
+    except Exception as e:
+        logger.error(f"Error initializing services: {str(e)}\n{traceback.format_exc()}")
+        st.error("❌ Failed to initialize services. Please check the logs and try again.")
+        st.stop()
+
+@st.cache_data(show_spinner=False, max_entries=16)
+def _extract_text(file_extension, file_bytes):
+    """Extract text from an uploaded document, cached on its type and content"""
+    return getattr(pdf_processor, TEXT_EXTRACTORS[file_extension])(file_bytes)
+
+@st.cache_data(show_spinner=False, max_entries=16)
+def _build_pdf_report(patient_data, structured_data, interpretation):
+    """Render the charts and PDF report, cached on the report inputs"""
+    # Generate visualization data first
+    visualization_data = {
+        "charts": {
+            "health_score": visualization_service.create_health_score_chart(
+                visualization_service.extract_health_score(interpretation)
+            ),
+            "severity": visualization_service.create_severity_chart(
+                pd.DataFrame(structured_data)
+            ),
+            "category": visualization_service.create_category_chart(
+                pd.DataFrame(structured_data)
+            )
+        }
+    }
+    
+    return report_generator.create_pdf_report(
+        patient_data, structured_data, interpretation, visualization_data
+    )
 
 # Process uploaded file with better error handling
 if uploaded_file:
+    # Reject unsupported types before doing any work
+    file_extension = Path(uploaded_file.name).suffix.lower().lstrip(".")
+    if file_extension not in TEXT_EXTRACTORS:
+        st.error("❌ Unsupported file format.")
+        st.stop()
+    
     with st.spinner("Processing your document..."):
         try:
             # Extract text based on file type
-            file_extension = uploaded_file.name.split(".")[-1].lower()
-            if file_extension == "pdf":
-                lab_text = pdf_processor.extract_text_from_pdf(uploaded_file)
-            elif file_extension == "docx":
-                lab_text = pdf_processor.extract_text_from_docx(uploaded_file)
-            else:
-                st.error("❌ Unsupported file format.")
-                st.stop()
+            lab_text = _extract_text(file_extension, uploaded_file.getvalue())
                 
             # Check if text extraction was successful
-            if not lab_text or len(lab_text.strip()) < 50:
-                st.warning("⚠️ Limited text extracted from the document. Results may be incomplete.")
+            analyzable = report_analyzer.has_analyzable_text(lab_text)
+            if not analyzable:
+                st.warning("⚠️ No analyzable text could be extracted from the document. Please upload a text-based PDF or DOCX.")
                 
         except Exception as e:
             logger.error(f"Error processing file: {str(e)}\n{traceback.format_exc()}")
@@ -235,32 +303,42 @@ if uploaded_file:
     # AI Interpretation section
     col1, col2 = st.columns([1, 5])
     with col1:
-        analyze_btn = st.button("🧠 Analyze", use_container_width=True)
+        analyze_btn = st.button("🧠 Analyze", use_container_width=True, disabled=not analyzable)
     with col2:
         if analyze_btn:
             # Show a more engaging progress indicator
             progress_bar = st.progress(0)
             status_text = st.empty()
             
-            for i in range(101):
-                # Update progress bar
-                progress_bar.progress(i)
-                if i < 30:
-                    status_text.text("Extracting lab values...")
-                elif i < 70:
-                    status_text.text("Analyzing results...")
-                elif i < 95:
-                    status_text.text("Generating interpretation...")
-                else:
-                    status_text.text("Finalizing report...")
-                time.sleep(0.02)
-            
-            # Remove progress indicators
-            progress_bar.empty()
-            status_text.empty()
+            # Run the analysis in the background and drive the progress bar
+            # from elapsed time until the result is ready
+            with ThreadPoolExecutor(max_workers=1) as executor:
+                # Updated from the worker thread as the model response streams in
+                received = {"chars": 0}
+                
+                def _on_progress(chars):
+                    received["chars"] = chars
+                
+                future = executor.submit(report_analyzer.analyze_lab_report, lab_text, _on_progress)
+                start_time = time.monotonic()
+                while not future.done():
+                    elapsed = time.monotonic() - start_time
+                    progress = min(95, int(elapsed / EXPECTED_ANALYSIS_SECONDS * 95))
+                    progress_bar.progress(progress)
+                    if received["chars"]:
+                        status_text.text(f"Generating interpretation... ({received['chars']:,} characters received)")
+                    elif progress < 30:
+                        status_text.text("Extracting lab values...")
+                    else:
+                        status_text.text("Analyzing results...")
+                    # Wakes as soon as the analysis finishes instead of sleeping a fixed interval
+                    wait([future], timeout=0.05)
+                
+                # Process the lab report
+                structured_data, interpretation = future.result()
             
-            # Process the lab report
-            structured_data, interpretation = report_analyzer.analyze_lab_report(lab_text)
+            progress_bar.progress(95)
+            status_text.text("Building PDF report...")
             
             # Store in session state
             st.session_state.lab_data = structured_data
@@ -275,24 +353,7 @@ if uploaded_file:
             }
             
             try:
-                # Generate visualization data first
-                visualization_data = {
-                    "charts": {
-                        "health_score": visualization_service.create_health_score_chart(
-                            visualization_service.extract_health_score(interpretation)
-                        ),
-                        "severity": visualization_service.create_severity_chart(
-                            pd.DataFrame(structured_data)
-                        ),
-                        "category": visualization_service.create_category_chart(
-                            pd.DataFrame(structured_data)
-                        )
-                    }
-                }
-                
-                pdf_content = report_generator.create_pdf_report(
-                    patient_data, structured_data, interpretation, visualization_data
-                )
+                pdf_content = _build_pdf_report(patient_data, structured_data, interpretation)
                 
                 if pdf_content is None:
                     st.error("Failed to generate PDF report. Please try again.")
@@ -314,11 +375,19 @@ if uploaded_file:
                 st.error(f"Error generating PDF report: {str(e)}")
                 logger.error(f"PDF generation error: {str(e)}\n{traceback.format_exc()}")
             
+            # Remove progress indicators
+            progress_bar.progress(100)
+            progress_bar.empty()
+            status_text.empty()
+            
             # Force a rerun to update the UI
             st.rerun()
 
 # Display results if processing is complete
 if 'processing_complete' in st.session_state and st.session_state.processing_complete:
+    # Build the results table once and share it across the views below
+    lab_df = pd.DataFrame(st.session_state.lab_data) if st.session_state.get('lab_data') else None
+    
     # Display comprehensive analysis results
     st.markdown('<h2 class="sub-header">📊 Comprehensive Analysis Results</h2>', unsafe_allow_html=True)
     
@@ -343,15 +412,14 @@ if 'processing_complete' in st.session_state and st.session_state.processing_com
     with tab2:
         # Display visualizations with better error handling
         try:
-            if 'lab_data' in st.session_state and st.session_state.lab_data:
+            if lab_df is not None:
                 # Display health score gauge with error handling
                 try:
                     health_score = visualization_service.extract_health_score(st.session_state.interpretation)
                     if health_score > 0:
                         st.markdown("### Health Score")
-                        fig = visualization_service.create_health_score_chart(health_score)
-                        st.pyplot(fig)
-                        plt.close(fig)  # Clean up
+                        st.metric("Overall health score", f"{health_score}/100")
+                        st.progress(min(health_score, 100))
                 except Exception as e:
                     logger.error(f"Error creating health score chart: {str(e)}")
                     st.warning("Could not generate health score visualization")
@@ -359,9 +427,10 @@ if 'processing_complete' in st.session_state and st.session_state.processing_com
                 # Display severity distribution with error handling
                 try:
                     st.markdown("### Test Result Severity Distribution")
-                    fig = visualization_service.create_severity_chart(pd.DataFrame(st.session_state.lab_data))
-                    st.pyplot(fig)
-                    plt.close(fig)  # Clean up
+                    severity_counts = lab_df['Severity'].value_counts().reindex(
+                        SEVERITY_ORDER, fill_value=0
+                    )
+                    st.bar_chart(severity_counts)
                 except Exception as e:
                     logger.error(f"Error creating severity chart: {str(e)}")
                     st.warning("Could not generate severity distribution visualization")
@@ -369,9 +438,9 @@ if 'processing_complete' in st.session_state and st.session_state.processing_com
                 # Display category distribution with error handling
                 try:
                     st.markdown("### Test Categories Analysis")
-                    fig = visualization_service.create_category_chart(pd.DataFrame(st.session_state.lab_data))
-                    st.pyplot(fig)
-                    plt.close(fig)  # Clean up
+                    # Normal vs abnormal tests per category, stacked
+                    result_type = lab_df['Status'].eq('Normal').map({True: 'Normal', False: 'Abnormal'})
+                    st.bar_chart(pd.crosstab(lab_df['Category'], result_type))
                 except Exception as e:
                     logger.error(f"Error creating category chart: {str(e)}")
                     st.warning("Could not generate category analysis visualization")
@@ -382,16 +451,19 @@ if 'processing_complete' in st.session_state and st.session_state.processing_com
     
     with tab3:
         # Display raw test results
-        if 'lab_data' in st.session_state and st.session_state.lab_data:
-            df = pd.DataFrame(st.session_state.lab_data)
-            
+        if lab_df is not None:
             st.markdown("### Raw Test Results")
-            st.dataframe(df, use_container_width=True)
+            st.dataframe(
+                lab_df,
+                use_container_width=True,
+                hide_index=True,
+                height=min(TABLE_ROW_HEIGHT * (len(lab_df) + 1) + 3, TABLE_MAX_HEIGHT)
+            )
             
             # Add export options
             col1, col2 = st.columns(2)
             with col1:
-                csv = df.to_csv(index=False).encode('utf-8')
+                csv = lab_df.to_csv(index=False).encode('utf-8')
                 st.download_button(
                     label="📥 Download as CSV",
                     data=csv,
@@ -399,7 +471,7 @@ if 'processing_complete' in st.session_state and st.session_state.processing_com
                     mime="text/csv"
                 )
             with col2:
-                json_str = df.to_json(orient='records', indent=2)
+                json_str = lab_df.to_json(orient='records', indent=2)
                 st.download_button(
                     label="📥 Download as JSON",
                     data=json_str,
@@ -408,8 +480,8 @@ if 'processing_complete' in st.session_state and st.session_state.processing_com
                 )
     
     # Display detailed test results
-    if 'lab_data' in st.session_state and st.session_state.lab_data:
-        report_analyzer.display_test_results(pd.DataFrame(st.session_state.lab_data))
+    if lab_df is not None:
+        report_analyzer.display_test_results(lab_df)
 
 # Footer
 st.markdown("---")
@@ -11,9 +11,13 @@ import os
 import logging
 import fitz  # PyMuPDF
 from pathlib import Path
-from typing import Dict, List, Union, Optional
+from typing import Dict, List
 import io
 import re
+import shutil
+import tempfile
+import zipfile
+import xml.etree.ElementTree as ET
 from datetime import datetime
 
 # Configure logging
@@ -23,6 +27,19 @@ logging.basicConfig(
 )
 logger = logging.getLogger("PDFProcessor")
 
+# Chunk size used when spooling file-like PDF inputs to a temporary file
+SPOOL_CHUNK_SIZE = 1024 * 1024
+
+# WordprocessingML elements read when streaming DOCX paragraph text
+W_NS = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
+W_PARAGRAPH = f"{W_NS}p"
+W_TEXT = f"{W_NS}t"
+W_BREAKS = {f"{W_NS}tab": "\t", f"{W_NS}br": "\n", f"{W_NS}cr": "\n"}
+
+# Text box content and its legacy duplicate are not part of the paragraph text
+MC_NS = "{http://schemas.openxmlformats.org/markup-compatibility/2006}"
+W_SKIPPED = {f"{W_NS}txbxContent", f"{MC_NS}Fallback"}
+
 class AdvancedPDFProcessor:
     """Advanced PDF processor for medical documents"""
     
@@ -35,20 +52,26 @@ class AdvancedPDFProcessor:
             'tiff': 'tiff'
         }
         
-        # Define section patterns
+        # Define section patterns, compiled once per processor
         self.section_patterns = {
-            'header': r'Health Report -\s*(.*?)\nPage \d+\s*\|\s*Generated on\s*(.*)',
-            'patient_info': r'Patient ID\s*Date of Collection\s*([A-Z0-9]+)\s*(\d{2}/\d{2}/\d{2})',
-            'basic_info': r'Basic Info\s*Patient ID\s*(.*?)\s*/\s*(\d+)\s*Yrs\s*([A-Z0-9]+)',
-            'toc': r'Table of contents(.*?)Disclaimer',
+            'header': re.compile(r'Health Report -\s*(.*?)\nPage \d+\s*\|\s*Generated on\s*(.*)', re.DOTALL),
+            'patient_info': re.compile(r'Patient ID\s*Date of Collection\s*([A-Z0-9]+)\s*(\d{2}/\d{2}/\d{2})', re.DOTALL),
+            'basic_info': re.compile(r'Basic Info\s*Patient ID\s*(.*?)\s*/\s*(\d+)\s*Yrs\s*([A-Z0-9]+)', re.DOTALL),
+            'toc': re.compile(r'Table of contents(.*?)Disclaimer', re.DOTALL),
+            # Each section runs from its heading to the heading that follows it
             'sections': {
-                'doctor_summary': r'Doctor Summary For(.*?)Wellbeing Index',
-                'wellbeing_index': r'Wellbeing Index(.*?)Important Parameters',
-                'important_parameters': r'Important Parameters(.*?)Wellness Recommendations',
-                'wellness_recommendations': r'Wellness Recommendations(.*?)References',
-                'references': r'References(.*?)End of Smart Report'
+                'doctor_summary': ('Doctor Summary For', 'Wellbeing Index'),
+                'wellbeing_index': ('Wellbeing Index', 'Important Parameters'),
+                'important_parameters': ('Important Parameters', 'Wellness Recommendations'),
+                'wellness_recommendations': ('Wellness Recommendations', 'References'),
+                'references': ('References', 'End of Smart Report')
             }
         }
+        # Every section heading, so one scan locates all of them
+        headings = {heading for bounds in self.section_patterns['sections'].values() for heading in bounds}
+        self.section_heading_pattern = re.compile('|'.join(re.escape(heading) for heading in sorted(headings)))
+        self.toc_line_pattern = re.compile(r'(\d+)\s+(.*?)\s+(\d+)')
+        self.blank_lines_pattern = re.compile(r'\n{3,}')
     
     def extract_text_from_pdf(self, pdf_file) -> str:
         """
@@ -61,6 +84,7 @@ class AdvancedPDFProcessor:
             str: Extracted text with preserved layout
         """
         doc = None
+        spool_path = None
         try:
             # Handle different input types
             if isinstance(pdf_file, (str, Path)):
@@ -68,43 +92,128 @@ class AdvancedPDFProcessor:
                 doc = fitz.open(str(pdf_file))
             elif isinstance(pdf_file, (bytes, bytearray)):
                 # If it's bytes data
-                doc = fitz.open(stream=pdf_file)
+                doc = fitz.open(stream=pdf_file, filetype="pdf")
             elif isinstance(pdf_file, io.BytesIO):
                 # If it's a BytesIO object
-                doc = fitz.open(stream=pdf_file.getvalue())
+                doc = fitz.open(stream=pdf_file.getvalue(), filetype="pdf")
+            elif isinstance(getattr(pdf_file, 'name', None), str) and os.path.isfile(pdf_file.name):
+                # If it's an open file on disk, let PyMuPDF read it from its path
+                doc = fitz.open(pdf_file.name)
             else:
-                # If it's a file-like object
-                content = pdf_file.read()
-                doc = fitz.open(stream=content)
+                # Spool other file-like objects to disk in chunks so the whole
+                # document is never held in memory as one bytes object
+                with tempfile.NamedTemporaryFile(suffix=".pdf", delete=False) as spool:
+                    spool_path = spool.name
+                    shutil.copyfileobj(pdf_file, spool, SPOOL_CHUNK_SIZE)
+                doc = fitz.open(spool_path)
             
-            text_content = []
+            return self._extract_text_from_document(doc)
             
-            for page_num in range(len(doc)):
-                page = doc[page_num]
-                
-                # Extract text with layout preservation
-                text = page.get_text("text")
+        except Exception as e:
+            logger.error(f"Error extracting text from PDF: {str(e)}")
+            return f"Error: {str(e)}"
+        finally:
+            if doc:
+                doc.close()
+            if spool_path:
+                os.unlink(spool_path)
+    
+    def _extract_text_from_document(self, doc) -> str:
+        """
+        Extract text from an open PyMuPDF document
+        
+        Args:
+            doc (fitz.Document): Open document; the caller is responsible for closing it
+            
+        Returns:
+            str: Extracted text with preserved layout
+        """
+        # Fail fast on password-protected documents before reading any pages
+        if doc.needs_pass:
+            raise ValueError("PDF is encrypted and requires a password")
+        
+        text_content = []
+        
+        # PyMuPDF documents are not thread-safe, so pages are read in one pass
+        for page_num, page in enumerate(doc):
+            # Extract text with layout preservation
+            text = page.get_text("text")
+            if text.strip():
                 text_content.append(text)
-                
-                # Log progress for large documents
-                if page_num > 0 and page_num % 10 == 0:
-                    logger.info(f"Processed {page_num} pages...")
             
-            # Join all pages with proper spacing
-            full_text = "\n\n".join(text_content)
+            # Log progress for large documents
+            if page_num > 0 and page_num % 10 == 0:
+                logger.info(f"Processed {page_num} pages...")
+        
+        # Join all pages with proper spacing
+        full_text = "\n\n".join(text_content)
+        
+        if not full_text:
+            logger.warning("No text content found in PDF")
+            return ""
+        
+        return full_text
+    
+    def extract_text_from_docx(self, docx_file) -> str:
+        """
+        Extract text from a Word document
+        
+        Args:
+            docx_file: File object, path to DOCX file, or bytes-like object
+            
+        Returns:
+            str: Extracted paragraph text
+        """
+        try:
+            if isinstance(docx_file, (bytes, bytearray)):
+                docx_file = io.BytesIO(docx_file)
+            elif isinstance(docx_file, Path):
+                docx_file = str(docx_file)
+            
+            with zipfile.ZipFile(docx_file) as archive, archive.open('word/document.xml') as document_xml:
+                full_text = "\n".join(self._iter_docx_paragraphs(document_xml))
             
             if not full_text.strip():
-                logger.warning("No text content found in PDF")
+                logger.warning("No text content found in DOCX")
                 return ""
             
             return full_text
             
         except Exception as e:
-            logger.error(f"Error extracting text from PDF: {str(e)}")
+            logger.error(f"Error extracting text from DOCX: {str(e)}")
             return f"Error: {str(e)}"
-        finally:
-            if doc:
-                doc.close()
+    
+    def _iter_docx_paragraphs(self, document_xml):
+        """Stream the text of each top-level body paragraph without building the full XML tree"""
+        # Depth 1 is w:document, 2 is w:body, 3 its paragraphs and tables
+        depth = 0
+        parts = None
+        # Depth of the text box or fallback subtree being skipped, if any
+        skip_depth = None
+        for event, element in ET.iterparse(document_xml, events=("start", "end")):
+            if event == "start":
+                depth += 1
+                if depth == 3 and element.tag == W_PARAGRAPH:
+                    parts = []
+                elif parts is not None and skip_depth is None and element.tag in W_SKIPPED:
+                    skip_depth = depth
+                continue
+            
+            if depth == skip_depth:
+                skip_depth = None
+            elif parts is not None and skip_depth is None:
+                if element.tag == W_TEXT:
+                    parts.append(element.text or "")
+                elif element.tag in W_BREAKS:
+                    parts.append(W_BREAKS[element.tag])
+            
+            if depth == 3:
+                if parts is not None:
+                    yield "".join(parts)
+                    parts = None
+                # Drop finished body elements so memory stays flat on large documents
+                element.clear()
+            depth -= 1
     
     def parse_medical_report(self, text: str) -> Dict:
         """
@@ -127,7 +236,7 @@ class AdvancedPDFProcessor:
             }
             
             # Extract header information
-            header_match = re.search(self.section_patterns['header'], text, re.DOTALL)
+            header_match = self.section_patterns['header'].search(text)
             if header_match:
                 report_data['header'] = {
                     'patient_name': header_match.group(1).strip(),
@@ -135,7 +244,7 @@ class AdvancedPDFProcessor:
                 }
             
             # Extract patient information
-            patient_info_match = re.search(self.section_patterns['patient_info'], text, re.DOTALL)
+            patient_info_match = self.section_patterns['patient_info'].search(text)
             if patient_info_match:
                 report_data['patient_info'] = {
                     'patient_id': patient_info_match.group(1).strip(),
@@ -143,7 +252,7 @@ class AdvancedPDFProcessor:
                 }
             
             # Extract basic information
-            basic_info_match = re.search(self.section_patterns['basic_info'], text, re.DOTALL)
+            basic_info_match = self.section_patterns['basic_info'].search(text)
             if basic_info_match:
                 report_data['patient_info'].update({
                     'name': basic_info_match.group(1).strip(),
@@ -152,16 +261,27 @@ class AdvancedPDFProcessor:
                 })
             
             # Extract table of contents
-            toc_match = re.search(self.section_patterns['toc'], text, re.DOTALL)
+            toc_match = self.section_patterns['toc'].search(text)
             if toc_match:
                 toc_text = toc_match.group(1).strip()
                 report_data['toc'] = self._parse_toc(toc_text)
             
-            # Extract main sections
-            for section_name, pattern in self.section_patterns['sections'].items():
-                section_match = re.search(pattern, text, re.DOTALL)
-                if section_match:
-                    section_content = section_match.group(1).strip()
+            # Locate every section heading in a single pass over the text
+            heading_spans = {}
+            for match in self.section_heading_pattern.finditer(text):
+                heading_spans.setdefault(match.group(0), []).append(match.span())
+            
+            # Extract main sections: from the first start heading to the next end heading after it
+            for section_name, (start_heading, end_heading) in self.section_patterns['sections'].items():
+                if start_heading not in heading_spans:
+                    continue
+                content_start = heading_spans[start_heading][0][1]
+                content_end = next(
+                    (start for start, _ in heading_spans.get(end_heading, []) if start >= content_start),
+                    None
+                )
+                if content_end is not None:
+                    section_content = text[content_start:content_end].strip()
                     report_data['sections'][section_name] = self._clean_section_text(section_content)
             
             return report_data
@@ -175,7 +295,7 @@ class AdvancedPDFProcessor:
         toc_entries = []
         for line in toc_text.split('\n'):
             if line.strip():
-                match = re.match(r'(\d+)\s+(.*?)\s+(\d+)', line.strip())
+                match = self.toc_line_pattern.match(line.strip())
                 if match:
                     toc_entries.append({
                         'number': match.group(1),
@@ -187,7 +307,7 @@ class AdvancedPDFProcessor:
     def _clean_section_text(self, text: str) -> str:
         """Clean and format section text"""
         # Remove multiple newlines
-        text = re.sub(r'\n{3,}', '\n\n', text)
+        text = self.blank_lines_pattern.sub('\n\n', text)
         # Remove trailing/leading whitespace from lines
         text = '\n'.join(line.strip() for line in text.split('\n'))
         return text
@@ -215,11 +335,16 @@ class AdvancedPDFProcessor:
             # Create output directory
             os.makedirs(output_dir, exist_ok=True)
             
-            # Extract text
+            # Extract text, opening the document once for both text and page count
             logger.info("Extracting text from PDF...")
-            text_content = self.extract_text_from_pdf(pdf_path)
+            doc = fitz.open(pdf_path)
+            try:
+                text_content = self._extract_text_from_document(doc)
+                total_pages = len(doc)
+            finally:
+                doc.close()
             
-            if text_content and not text_content.startswith("Error"):
+            if text_content:
                 # Parse medical report
                 logger.info("Parsing medical report structure...")
                 structured_data = self.parse_medical_report(text_content)
@@ -241,18 +366,16 @@ class AdvancedPDFProcessor:
                 result['output_files'] = [text_output_path, json_output_path]
                 
                 # Add basic statistics
-                doc = fitz.open(pdf_path)
                 result['stats'] = {
-                    'total_pages': len(doc),
+                    'total_pages': total_pages,
                     'text_length': len(text_content),
                     'sections_extracted': len(structured_data.get('sections', {}))
                 }
-                doc.close()
                 
                 result['success'] = True
                 logger.info("PDF processing completed successfully")
             else:
-                result['error'] = text_content if text_content.startswith("Error") else "No text extracted"
+                result['error'] = "No text extracted"
                 result['success'] = False
             
             return result
@@ -3,12 +3,16 @@
 HealthLensAI Example: Process a medical lab report
 
 This script provides functionality to process medical lab reports using the
-EnhancedPDFProcessor, with improved path handling and Windows compatibility.
+AdvancedPDFProcessor, with improved path handling and Windows compatibility.
 """
 
 import os
+import time
 import logging
-from enhanced_pdf_processor import EnhancedPDFProcessor
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import dataclass, field
+from functools import lru_cache
+from pathlib import Path
 
 # Configure logging
 logging.basicConfig(
@@ -17,6 +21,42 @@ logging.basicConfig(
 )
 logger = logging.getLogger("HealthLensAI.Example")
 
+# File suffixes accepted as PDF reports
+PDF_EXTENSIONS = {'.pdf'}
+
+@dataclass
+class BatchResult:
+    """Outcome of processing several lab reports"""
+    successful: list = field(default_factory=list)
+    failed: list = field(default_factory=list)
+    total_processed: int = 0
+    processing_time: float = 0.0
+
+@lru_cache(maxsize=1)
+def _get_processor():
+    """Build the PDF processor once per process and reuse it for every report"""
+    # Imported here so importing this module does not load PyMuPDF
+    from pdf_processor import AdvancedPDFProcessor
+    
+    logger.info("Initializing PDF processor...")
+    return AdvancedPDFProcessor()
+
+def iter_pdfs(root):
+    """
+    Yield the paths of the PDF files directly inside a directory
+    
+    Args:
+        root (str): Directory to scan
+        
+    Yields:
+        str: Path of each PDF file, in directory order
+    """
+    # DirEntry caches the file type from the directory read, so no per-file stat is needed
+    with os.scandir(root) as entries:
+        for entry in entries:
+            if entry.is_file() and os.path.splitext(entry.name)[1].lower() in PDF_EXTENSIONS:
+                yield entry.path
+
 def process_lab_report(pdf_path, output_dir="output"):
     """
     Process a lab report PDF and generate analysis
@@ -29,64 +69,118 @@ def process_lab_report(pdf_path, output_dir="output"):
         bool: True if processing was successful, False otherwise
     """
     try:
-        # Normalize path (fix Windows backslash issues)
-        pdf_path = os.path.normpath(pdf_path)
+        # Build the path once (fixes Windows backslash issues)
+        pdf_file = Path(pdf_path)
         
-        # Validate input file
-        if not os.path.exists(pdf_path):
-            logger.error(f"PDF file not found: {pdf_path}")
+        # Validate input file; one stat call both checks existence and gives the size
+        try:
+            file_size = pdf_file.stat().st_size
+        except FileNotFoundError:
+            logger.error("PDF file not found: %s", pdf_file)
             return False
             
-        if not pdf_path.lower().endswith('.pdf'):
-            logger.error(f"File is not a PDF: {pdf_path}")
+        if pdf_file.suffix.lower() not in PDF_EXTENSIONS:
+            logger.error("File is not a PDF: %s", pdf_file)
             return False
         
-        # Initialize processor
-        logger.info("Initializing PDF processor...")
-        processor = EnhancedPDFProcessor()
+        # Reuse the processor built for this process
+        processor = _get_processor()
         
-        # Create output directory if it doesn't exist
-        os.makedirs(output_dir, exist_ok=True)
-        
-        # Process the PDF
-        logger.info(f"Processing PDF: {pdf_path}")
-        result = processor.process_pdf(pdf_path, output_dir)
+        # Process the PDF; process_pdf creates the output directory
+        logger.info("Processing PDF: %s (%d bytes)", pdf_file, file_size)
+        result = processor.process_pdf(str(pdf_file), output_dir)
         
         if result["success"]:
             logger.info("PDF processed successfully!")
             
-            # Log additional information if available
-            if "stats" in result:
-                logger.info("Processing statistics:")
-                for key, value in result["stats"].items():
-                    logger.info(f"  {key}: {value}")
-                    
-            if "output_files" in result:
-                logger.info("Generated output files:")
-                for file_path in result["output_files"]:
-                    logger.info(f"  - {file_path}")
+            # Log additional information if available, one record per block;
+            # skipped entirely below INFO
+            if logger.isEnabledFor(logging.INFO):
+                if "stats" in result:
+                    logger.info("Processing statistics:\n%s", "\n".join(
+                        f"  {key}: {value}" for key, value in result["stats"].items()
+                    ))
+                        
+                output_files = result.get("output_files", ())
+                if output_files:
+                    logger.info("Generated output files:\n%s", "\n".join(
+                        f"  - {file_path}" for file_path in output_files
+                    ))
             
             return True
         else:
             error_msg = result.get('error', 'Unknown error')
-            logger.error(f"PDF processing failed: {error_msg}")
+            logger.error("PDF processing failed: %s", error_msg)
             
             # Log additional error details if available
             if "details" in result:
-                logger.error("Error details:")
-                for detail in result["details"]:
-                    logger.error(f"  - {detail}")
+                logger.error("Error details:\n%s", "\n".join(
+                    f"  - {detail}" for detail in result["details"]
+                ))
             
             return False
             
     except Exception as e:
-        logger.error(f"Error processing lab report: {str(e)}", exc_info=True)
+        logger.error("Error processing lab report: %s", e, exc_info=True)
         return False
 
-if __name__ == "__main__":
-    # Example usage - use raw string for Windows paths
-    pdf_path = r"C:\Users\nsmeg\Downloads\Deepa-24-12-2024.pdf"  # Note the 'r' prefix
-    process_lab_report(pdf_path)
+def process_lab_reports(pdf_paths, output_dir="output", max_workers=None):
+    """
+    Process several lab report PDFs in parallel worker processes
+    
+    Each report is written to its own subdirectory of output_dir, named
+    after the PDF, since every report produces the same output file names.
+    
+    Args:
+        pdf_paths (iterable): Paths to the PDF files to process
+        output_dir (str): Directory to store output files (default: "output")
+        max_workers (int, optional): Number of worker processes (default: CPU count)
+        
+    Returns:
+        BatchResult: Successful and failed paths with overall timing
+    """
+    start_time = time.perf_counter()
+    batch = BatchResult()
+    
+    # Each worker builds its processor up front rather than on its first report
+    with ProcessPoolExecutor(max_workers=max_workers, initializer=_get_processor) as executor:
+        futures = {
+            executor.submit(process_lab_report, pdf_path, os.path.join(output_dir, Path(pdf_path).stem)): pdf_path
+            for pdf_path in pdf_paths
+        }
+        for future in as_completed(futures):
+            pdf_path = futures[future]
+            try:
+                succeeded = future.result()
+            except Exception as e:
+                logger.error("Worker failed on %s: %s", pdf_path, e)
+                succeeded = False
+            (batch.successful if succeeded else batch.failed).append(pdf_path)
+            batch.total_processed += 1
+            logger.info("Processed %d/%d: %s", batch.total_processed, len(futures), pdf_path)
+    
+    batch.processing_time = time.perf_counter() - start_time
+    logger.info(
+        "Batch complete: %d succeeded, %d failed in %.1fs",
+        len(batch.successful), len(batch.failed), batch.processing_time
+    )
+    return batch
 
-    # Custom output directory
-    process_lab_report(r"C:\Users\nsmeg\Downloads\Deepa-24-12-2024.pdf", output_dir="custom_output")
\ No newline at end of file
+if __name__ == "__main__":
+    # Example usage - use raw strings for Windows paths
+    pdf_paths = [
+        r"C:\Users\nsmeg\Downloads\Deepa-24-12-2024.pdf",  # Note the 'r' prefix
+    ]
+    
+    # Directories in the list are expanded to the PDFs they contain
+    pdf_paths = [
+        path
+        for entry in pdf_paths
+        for path in (iter_pdfs(entry) if os.path.isdir(entry) else (entry,))
+    ]
+    
+    if len(pdf_paths) == 1:
+        process_lab_report(pdf_paths[0])
+    else:
+        # Several reports are spread across worker processes
+        process_lab_reports(pdf_paths, output_dir="output")
@@ -2,42 +2,54 @@
 """
 Medical PDF Processing Script
 This script provides functionality to process medical PDF files using the AdvancedPDFProcessor.
-It extracts text, analyzes document structure, and identifies abnormal values.
+It extracts text and parses it into patient information and report sections.
 """
 
+import atexit
 import logging
-import io
 import os
+import queue
 import sys
+from logging.handlers import QueueHandler, QueueListener
 from pathlib import Path
 
 # Add parent directory to path to allow imports from sibling modules
 sys.path.append(str(Path(__file__).parent))
 
-from pdf_processor import AdvancedPDFProcessor
-
-# Configure logging
+# Configure logging; records are formatted by the QueueHandler and written
+# to the console and log file by a background listener thread
+log_queue = queue.Queue(-1)
+log_listener = QueueListener(
+    log_queue,
+    logging.StreamHandler(),
+    logging.FileHandler('medical_pdf_processing.log')
+)
 logging.basicConfig(
     level=logging.INFO,
     format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.StreamHandler(),
-        logging.FileHandler('medical_pdf_processing.log')
-    ]
+    handlers=[QueueHandler(log_queue)]
 )
+log_listener.start()
+atexit.register(log_listener.stop)
 
 logger = logging.getLogger("MedicalPDFProcessor")
 
+# File suffixes accepted as PDF reports
+PDF_EXTENSIONS = {'.pdf'}
+
 class MedicalPDFProcessor:
     """Wrapper class for processing medical PDFs with enhanced error handling and logging"""
     
     def __init__(self):
         """Initialize the processor with the AdvancedPDFProcessor"""
         try:
+            # Imported here so importing this module does not load PyMuPDF
+            from pdf_processor import AdvancedPDFProcessor
+            
             self.processor = AdvancedPDFProcessor()
             logger.info("Medical PDF Processor initialized successfully")
         except Exception as e:
-            logger.error(f"Failed to initialize Medical PDF Processor: {str(e)}")
+            logger.error("Failed to initialize Medical PDF Processor: %s", e)
             raise
 
     def process_medical_pdf(self, pdf_path):
@@ -48,62 +60,63 @@ class MedicalPDFProcessor:
             pdf_path (str): Path to the PDF file
             
         Returns:
-            dict: Document structure containing patient info, test sections, and abnormal flags
+            dict: Parsed report containing header, patient info, and report sections
             None: If processing fails
         """
         try:
-            # Validate file exists
-            if not os.path.exists(pdf_path):
-                raise FileNotFoundError(f"PDF file not found: {pdf_path}")
+            # Validate file exists; os.stat raises FileNotFoundError and gives the size
+            file_size = os.stat(pdf_path).st_size
             
             # Validate file is a PDF
-            if not pdf_path.lower().endswith('.pdf'):
+            if Path(pdf_path).suffix.lower() not in PDF_EXTENSIONS:
                 raise ValueError("File must be a PDF")
             
-            logger.info(f"Processing medical PDF: {pdf_path}")
+            logger.info("Processing medical PDF: %s (%d bytes)", pdf_path, file_size)
             
-            # Open and process the PDF
-            with open(pdf_path, 'rb') as pdf_file:
-                # Extract text from the PDF
-                extracted_text = self.processor.extract_text_from_pdf(pdf_file)
-                
-                if not extracted_text or extracted_text.startswith("Error"):
-                    logger.error(f"Failed to extract text from PDF: {extracted_text}")
-                    return None
-                
-                # Log first 500 characters of extracted text
-                preview = extracted_text[:500] + "..." if len(extracted_text) > 500 else extracted_text
-                logger.info("=== EXTRACTED TEXT PREVIEW ===\n%s", preview)
-                
-                # Analyze document structure
-                doc_structure = self.processor.analyze_document_structure(extracted_text)
-                
-                # Log patient information
+            # Extract text from the PDF; PyMuPDF reads pages from the file on disk as needed
+            extracted_text = self.processor.extract_text_from_pdf(pdf_path)
+            
+            if not extracted_text or extracted_text.startswith("Error"):
+                logger.error("Failed to extract text from PDF: %s", extracted_text)
+                return None
+            
+            # Log first 500 characters of extracted text; skipped entirely below INFO
+            if logger.isEnabledFor(logging.INFO):
+                logger.info(
+                    "=== EXTRACTED TEXT PREVIEW ===\n%s%s",
+                    extracted_text[:500],
+                    "..." if len(extracted_text) > 500 else ""
+                )
+            
+            # Parse the report structure; the parser returns an empty dict on failure
+            doc_structure = self.processor.parse_medical_report(extracted_text)
+            if not doc_structure:
+                logger.error("Failed to parse medical report structure")
+                return None
+            
+            # Log patient information and extracted sections as single records;
+            # the joined strings are only built when INFO is enabled
+            if logger.isEnabledFor(logging.INFO):
                 if doc_structure["patient_info"]:
-                    logger.info("=== PATIENT INFORMATION ===")
-                    for key, value in doc_structure["patient_info"].items():
-                        logger.info("%s: %s", key.replace('_', ' ').title(), value)
-                
-                # Log abnormal flags
-                if doc_structure["abnormal_flags"]:
-                    logger.info("=== ABNORMAL VALUES ===")
-                    for flag in doc_structure["abnormal_flags"]:
-                        logger.info(
-                            "%s: %s (%s) - Reference: %s",
-                            flag['test'],
-                            flag['value'],
-                            flag['status'],
-                            flag['reference']
-                        )
+                    logger.info("=== PATIENT INFORMATION ===\n%s", "\n".join(
+                        f"{key.replace('_', ' ').title()}: {value}"
+                        for key, value in doc_structure["patient_info"].items()
+                    ))
                 
-                return doc_structure
+                if doc_structure["sections"]:
+                    logger.info("=== REPORT SECTIONS ===\n%s", "\n".join(
+                        f"{name.replace('_', ' ').title()}: {len(content)} characters"
+                        for name, content in doc_structure["sections"].items()
+                    ))
+            
+            return doc_structure
                 
         except FileNotFoundError as e:
-            logger.error(f"File not found error: {str(e)}")
+            logger.error("File not found error: %s", e)
         except ValueError as e:
-            logger.error(f"Value error: {str(e)}")
+            logger.error("Value error: %s", e)
         except Exception as e:
-            logger.error(f"Error processing PDF: {str(e)}", exc_info=True)
+            logger.error("Error processing PDF: %s", e, exc_info=True)
         
         return None
 
@@ -127,7 +140,7 @@ def main():
             return 1
             
     except Exception as e:
-        logger.error(f"Unexpected error: {str(e)}", exc_info=True)
+        logger.error("Unexpected error: %s", e, exc_info=True)
         return 1
 
 if __name__ == "__main__":
@@ -1,14 +1,142 @@
 import logging
 import json
-import traceback
-import pandas as pd
-import numpy as np
+import os
+import hashlib
 import re
-from collections import defaultdict
+import random
+import time
+from functools import lru_cache
+
+# orjson is optional; its JSONDecodeError subclasses json.JSONDecodeError
+try:
+    import orjson
+    _json_loads = orjson.loads
+except ImportError:
+    _json_loads = json.loads
 
 
 logger = logging.getLogger("HealthLensAI.AdvancedReportAnalyzer")
 
+# Primary model settings
+GENERATION_CONFIG = {
+    "temperature": 0.2,  # Lower temperature for more factual responses
+    "top_p": 0.95,
+    "top_k": 40,
+    "max_output_tokens": 8192,
+}
+
+SAFETY_SETTINGS = [
+    {"category": "HARM_CATEGORY_HARASSMENT", "threshold": "BLOCK_MEDIUM_AND_ABOVE"},
+    {"category": "HARM_CATEGORY_HATE_SPEECH", "threshold": "BLOCK_MEDIUM_AND_ABOVE"},
+    {"category": "HARM_CATEGORY_SEXUALLY_EXPLICIT", "threshold": "BLOCK_MEDIUM_AND_ABOVE"},
+    {"category": "HARM_CATEGORY_DANGEROUS_CONTENT", "threshold": "BLOCK_MEDIUM_AND_ABOVE"},
+]
+
+# Markdown code fences (```json ... ```) the model may wrap around its JSON
+FENCE_RE = re.compile(r"^\s*```(?:json)?\s*|\s*```\s*$", re.IGNORECASE)
+UNQUOTED_KEY_RE = re.compile(r'(\w+):')
+
+# Leading number of a value ("14.5 g/dL") and the bounds of a range ("13.5-17.5 g/dL")
+NUMBER_RE = re.compile(r"[-+]?\d*\.?\d+")
+RANGE_RE = re.compile(r"(\d*\.?\d+)\s*-\s*(\d*\.?\d+)")
+
+# Reports shorter than this (after stripping) are not worth an API call
+MIN_REPORT_CHARS = 50
+
+# Runs of spaces/tabs and blank lines in extracted text that only cost prompt tokens
+INLINE_SPACE_RE = re.compile(r"[ \t]+")
+BLANK_LINES_RE = re.compile(r"\n(?:[ \t]*\n){2,}")
+
+# Longer reports (~15k tokens at ~4 chars/token) are reduced to their lab value lines
+MAX_REPORT_CHARS = 60000
+LAB_VALUE_RE = re.compile(r"\b(mg/dl|mmol/l|g/dl|iu/l|u/l|ng/ml|pg/ml|/mcl|fl|meq/l)\b|%", re.IGNORECASE)
+LAB_VALUE_CONTEXT_LINES = 2
+
+# Smart Report sections that carry the results, preferred over the full text when it is too long
+PROMPT_SECTIONS = ('important_parameters', 'doctor_summary')
+
+# Status marker shown next to each value; anything else is treated as normal
+STATUS_ICONS = {"High": "🔴", "Low": "🔵", "Normal": "🟢"}
+
+# Fallback interpretations for common test types, matched on test name
+FALLBACK_INTERPRETATIONS = {
+    "Glucose": "This test measures your blood sugar levels. Abnormal results may indicate issues with blood sugar regulation.",
+    "HbA1c": "This test shows your average blood sugar level over the past 2-3 months.",
+    "Cholesterol": "This test measures blood fats that can affect your heart health.",
+    "HDL": "This measures 'good' cholesterol that helps remove other forms of cholesterol from your bloodstream.",
+    "LDL": "This measures 'bad' cholesterol that can build up in your arteries.",
+    "Triglycerides": "This measures a type of fat in your blood that can affect heart health.",
+    "Hemoglobin": "This measures the oxygen-carrying protein in your blood.",
+    "Iron": "This measures the iron levels in your blood, which is important for producing red blood cells.",
+    "Vitamin D": "This measures vitamin D levels, which is important for bone health and immune function.",
+    "TSH": "This measures thyroid stimulating hormone, which indicates thyroid function.",
+    "Creatinine": "This measures kidney function by checking how well your kidneys filter waste."
+}
+
+# Fallback recommendations for common test types, matched on test name
+FALLBACK_RECOMMENDATIONS = {
+    "Glucose": [
+        "Monitor your blood sugar levels as recommended",
+        "Follow a balanced diet low in simple sugars",
+        "Engage in regular physical activity",
+        "Maintain a healthy weight",
+        "Take medications as prescribed"
+    ],
+    "HbA1c": [
+        "Work with your healthcare provider on diabetes management",
+        "Monitor blood sugar levels regularly",
+        "Follow a balanced diet",
+        "Exercise regularly",
+        "Take medications as prescribed"
+    ],
+    "Cholesterol": [
+        "Follow a heart-healthy diet",
+        "Exercise regularly",
+        "Maintain a healthy weight",
+        "Avoid smoking",
+        "Limit alcohol consumption"
+    ]
+}
+
+# Models used for analysis; the name of the model that answered is part of the cache key
+PRIMARY_MODEL_NAME = "gemini-1.5-flash"
+BACKUP_MODEL_NAME = "gemini-1.0-pro"
+
+# Bump PROMPT_VERSION whenever the prompt changes so cached analyses are not reused
+PROMPT_VERSION = "v2"
+
+# Environment variable naming the on-disk analysis cache directory; unset disables it,
+# since cache entries hold the patient's lab values and interpretation in plain text
+ANALYSIS_CACHE_DIR_ENV = "ANALYSIS_CACHE_DIR"
+
+# Retry policy for transient Gemini errors (rate limits, overload)
+MAX_RETRIES = 3
+RETRY_BASE_DELAY = 1.0
+RETRY_MAX_DELAY = 60.0
+
+
+@lru_cache(maxsize=None)
+def _get_models(api_key):
+    """Configure the Gemini client once per API key and return (primary, backup) models"""
+    import google.generativeai as genai
+    
+    genai.configure(api_key=api_key)
+    
+    primary_model = genai.GenerativeModel(
+        model_name=PRIMARY_MODEL_NAME,
+        generation_config=GENERATION_CONFIG,
+        safety_settings=SAFETY_SETTINGS
+    )
+    backup_model = genai.GenerativeModel(BACKUP_MODEL_NAME)
+    return primary_model, backup_model
+
+
+@lru_cache(maxsize=1)
+def _get_report_parser():
+    """Build the section parser once; only oversized reports need it"""
+    from pdf_processor import AdvancedPDFProcessor
+    return AdvancedPDFProcessor()
+
 
 class AdvancedReportAnalyzer:
     """Enterprise-grade medical data interpretation and analysis with advanced analytics"""
@@ -22,50 +150,43 @@ class AdvancedReportAnalyzer:
         self.test_relationships = self._load_test_relationships()
         self.condition_patterns = self._load_condition_patterns()
         self.analysis_cache = {}
+        self.analysis_cache_size = 128
+        self.analysis_cache_ttl = 24 * 3600  # seconds
+        self.analysis_cache_dir = os.getenv(ANALYSIS_CACHE_DIR_ENV) or None
+        self._prune_cached_analyses()
     
     def _configure_ai(self):
         """Configure the AI API with error handling and advanced options"""
         try:
-            # Import here to avoid circular imports
-            import google.generativeai as genai
-            import streamlit as st
-           
-            api_key = st.secrets["google"]["api_key"]
+            api_key = self._get_api_key()
             if not api_key:
                 raise ValueError("API key not available")
                 
-            genai.configure(api_key=api_key)
-           
-            # Configure primary model with enhanced settings
-            generation_config = {
-                "temperature": 0.2,  # Lower temperature for more factual responses
-                "top_p": 0.95,
-                "top_k": 40,
-                "max_output_tokens": 8192,
-            }
-           
-            safety_settings = [
-                {"category": "HARM_CATEGORY_HARASSMENT", "threshold": "BLOCK_MEDIUM_AND_ABOVE"},
-                {"category": "HARM_CATEGORY_HATE_SPEECH", "threshold": "BLOCK_MEDIUM_AND_ABOVE"},
-                {"category": "HARM_CATEGORY_SEXUALLY_EXPLICIT", "threshold": "BLOCK_MEDIUM_AND_ABOVE"},
-                {"category": "HARM_CATEGORY_DANGEROUS_CONTENT", "threshold": "BLOCK_MEDIUM_AND_ABOVE"},
-            ]
-           
-            self.primary_model = genai.GenerativeModel(
-                model_name="gemini-1.5-flash",
-                generation_config=generation_config,
-                safety_settings=safety_settings
-            )
-           
-            # Configure backup model
-            self.backup_model = genai.GenerativeModel("gemini-1.0-pro")
-                
+            self.primary_model, self.backup_model = _get_models(api_key)
+            
             logger.info("AI API configured successfully with enhanced settings")
         except Exception as e:
             logger.error(f"AI API configuration failed: {str(e)}")
             self.primary_model = None
             self.backup_model = None
     
+    def _get_api_key(self):
+        """Read the Gemini API key from Streamlit secrets, falling back to the GOOGLE_API_KEY environment variable"""
+        try:
+            # Import here to avoid circular imports
+            import streamlit as st
+            return st.secrets["google"]["api_key"]
+        except Exception:
+            pass
+        
+        # python-dotenv is optional; it lets the key live in a local .env file
+        try:
+            from dotenv import load_dotenv
+            load_dotenv()
+        except ImportError:
+            pass
+        return os.getenv("GOOGLE_API_KEY")
+    
     def _load_interpretations_db(self):
         """Load comprehensive interpretations database"""
         # This would typically load from a database or comprehensive JSON file
@@ -177,80 +298,91 @@ class AdvancedReportAnalyzer:
             return self.recommendations_db[test][status]
         return "• Consult your healthcare provider for personalized advice\n• Consider follow-up testing as recommended\n• Monitor symptoms and changes"
    
-    def analyze_lab_report(self, report_text):
-        """Analyze lab report text and return structured data and interpretation"""
+    def has_analyzable_text(self, report_text):
+        """Check whether extracted text is substantial enough to send for analysis"""
+        if not report_text or report_text.startswith("Error:"):
+            return False
+        return len(report_text.strip()) >= MIN_REPORT_CHARS
+    
+    def analyze_lab_report(self, report_text, progress_callback=None):
+        """Analyze lab report text and return structured data and interpretation
+        
+        progress_callback, if given, is called with the number of response
+        characters received so far while the model output streams in.
+        """
+        if not self.has_analyzable_text(report_text):
+            logger.warning("Report text is empty or an extraction error; skipping AI analysis")
+            return self._generate_fallback_data(), self._generate_fallback_interpretation()
+        
+        # Identical report text returns the previous analysis without calling the API
+        cached = self._get_cached_analysis(report_text)
+        if cached:
+            return cached
+        
         try:
             if not (self.primary_model or self.backup_model):
                 logger.error("No AI models available for analysis")
                 return self._generate_fallback_data(), self._generate_fallback_interpretation()
 
-            interpretation_prompt = self._prepare_interpretation_prompt(report_text)
-            extraction_prompt = self._prepare_extraction_prompt(report_text)
-            
-            interpretation_response = None
-            extraction_response = None
+            prompt = self._prepare_analysis_prompt(self._limit_report_text(report_text))
+            response = None
+            response_model_name = None
             
-            # Try primary model first
+            # Try primary model first, asking for a strict JSON response
             if self.primary_model:
                 try:
-                    interpretation_response = self.primary_model.generate_content(interpretation_prompt)
-                    extraction_response = self.primary_model.generate_content(extraction_prompt)
+                    response = self._generate_streamed(
+                        self.primary_model, prompt, progress_callback,
+                        generation_config={"response_mime_type": "application/json"}
+                    )
+                    response_model_name = PRIMARY_MODEL_NAME
                 except Exception as e:
                     logger.warning(f"Primary model failed: {str(e)}")
             
             # Fall back to backup model if primary failed or not available
-            if not (interpretation_response and extraction_response) and self.backup_model:
+            if not response and self.backup_model:
                 try:
-                    interpretation_response = self.backup_model.generate_content(interpretation_prompt)
-                    extraction_response = self.backup_model.generate_content(extraction_prompt)
+                    response = self._generate_streamed(self.backup_model, prompt, progress_callback)
+                    response_model_name = BACKUP_MODEL_NAME
                 except Exception as e:
                     logger.error(f"Backup model failed: {str(e)}")
             
-            if not (interpretation_response and extraction_response):
+            if not response:
                 logger.error("Failed to generate responses from both models")
                 return self._generate_fallback_data(), self._generate_fallback_interpretation()
             
             try:
-                # Convert the extraction response to string before parsing JSON
-                if hasattr(extraction_response, 'text'):
-                    extraction_text = extraction_response.text
-                elif hasattr(extraction_response, 'parts'):
-                    extraction_text = ''.join([part.text for part in extraction_response.parts])
-                else:
-                    extraction_text = str(extraction_response)
-                
-                # Convert the interpretation response to string
-                if hasattr(interpretation_response, 'text'):
-                    interpretation_text = interpretation_response.text
-                elif hasattr(interpretation_response, 'parts'):
-                    interpretation_text = ''.join([part.text for part in interpretation_response.parts])
-                else:
-                    interpretation_text = str(interpretation_response)
-                
-                # Clean up the extraction text to ensure it's valid JSON
-                extraction_text = extraction_text.strip()
-                if not extraction_text.startswith('['):
-                    # Try to find the JSON array in the text
-                    start_idx = extraction_text.find('[')
-                    end_idx = extraction_text.rfind(']')
+                # Clean up the response text to ensure it's valid JSON
+                response_text = FENCE_RE.sub('', response).strip()
+                if not (response_text.startswith('{') and response_text.endswith('}')):
+                    # Try to find the JSON object in surrounding prose
+                    start_idx = response_text.find('{')
+                    end_idx = response_text.rfind('}')
                     if start_idx != -1 and end_idx != -1:
-                        extraction_text = extraction_text[start_idx:end_idx + 1]
+                        response_text = response_text[start_idx:end_idx + 1]
                     else:
-                        logger.error("Could not find valid JSON array in response")
-                        return self._generate_fallback_data(), interpretation_text
+                        logger.error("Could not find valid JSON object in response")
+                        return self._generate_fallback_data(), self._generate_fallback_interpretation()
                 
                 try:
-                    structured_data = json.loads(extraction_text)
+                    analysis = _json_loads(response_text)
                 except json.JSONDecodeError:
                     logger.error("Failed to parse JSON, trying to fix common issues")
                     # Try to fix common JSON formatting issues
-                    extraction_text = re.sub(r'(\w+):', r'"\1":', extraction_text)  # Quote unquoted keys
-                    extraction_text = re.sub(r'\'', r'"', extraction_text)  # Replace single quotes with double quotes
+                    response_text = UNQUOTED_KEY_RE.sub(r'"\1":', response_text)  # Quote unquoted keys
+                    response_text = response_text.replace("'", '"')  # Replace single quotes with double quotes
                     try:
-                        structured_data = json.loads(extraction_text)
+                        analysis = _json_loads(response_text)
                     except json.JSONDecodeError as e:
                         logger.error(f"Failed to parse fixed JSON: {str(e)}")
-                        return self._generate_fallback_data(), interpretation_text
+                        return self._generate_fallback_data(), self._generate_fallback_interpretation()
+                
+                if isinstance(analysis, dict):
+                    interpretation_text = analysis.get('interpretation') or self._generate_fallback_interpretation()
+                    structured_data = analysis.get('tests') or self._generate_fallback_data()
+                else:
+                    interpretation_text = self._generate_fallback_interpretation()
+                    structured_data = analysis
                 
                 # Ensure structured_data is a list
                 if not isinstance(structured_data, list):
@@ -276,10 +408,10 @@ class AdvancedReportAnalyzer:
                         else:
                             # Calculate severity based on how far the value is from the reference range
                             try:
-                                value = float(test.get('Value', '0').split()[0])
-                                ref_range = test.get('ReferenceRange', '')
-                                if '-' in ref_range:
-                                    low, high = map(float, ref_range.split('-'))
+                                value = float(NUMBER_RE.search(str(test.get('Value', '0'))).group())
+                                range_match = RANGE_RE.search(str(test.get('ReferenceRange', '')))
+                                if range_match:
+                                    low, high = map(float, range_match.groups())
                                     mid = (low + high) / 2
                                     deviation = abs(value - mid) / (high - low)
                                     
@@ -298,15 +430,130 @@ class AdvancedReportAnalyzer:
                     if 'Status' not in test:
                         test['Status'] = 'Normal'  # Default to Normal if not specified
                 
+                # Only successful analyses are cached; fallbacks are retried next time
+                cache_key = self._analysis_cache_key(response_model_name, report_text)
+                self._remember_analysis(cache_key, (structured_data, interpretation_text))
+                self._store_cached_analysis(cache_key, structured_data, interpretation_text)
+                
                 return structured_data, interpretation_text
             except json.JSONDecodeError as e:
-                logger.error(f"Failed to parse extraction response: {str(e)}")
-                return self._generate_fallback_data(), interpretation_text
+                logger.error(f"Failed to parse analysis response: {str(e)}")
+                return self._generate_fallback_data(), self._generate_fallback_interpretation()
             
         except Exception as e:
             logger.error(f"Error analyzing lab report: {str(e)}")
             return self._generate_fallback_data(), self._generate_fallback_interpretation()
    
+    def _analysis_cache_key(self, model_name, report_text):
+        """Cache key for the analysis of report_text produced by model_name"""
+        return hashlib.sha256(
+            f"{model_name}|{PROMPT_VERSION}|{report_text}".encode('utf-8')
+        ).hexdigest()
+    
+    def _get_cached_analysis(self, report_text):
+        """Return a cached analysis of report_text from either model, checking memory before disk"""
+        for model_name in (PRIMARY_MODEL_NAME, BACKUP_MODEL_NAME):
+            cache_key = self._analysis_cache_key(model_name, report_text)
+            cached = self.analysis_cache.get(cache_key)
+            if cached and time.monotonic() - cached[0] < self.analysis_cache_ttl:
+                logger.info("Returning cached analysis")
+                return cached[1]
+            
+            cached = self._load_cached_analysis(cache_key)
+            if cached:
+                logger.info("Returning analysis cached on disk")
+                self._remember_analysis(cache_key, cached)
+                return cached
+        return None
+    
+    def _remember_analysis(self, cache_key, analysis):
+        """Store an analysis in the in-memory cache, evicting the oldest entry when full"""
+        self.analysis_cache.pop(cache_key, None)  # Re-insert expired entries as newest
+        if len(self.analysis_cache) >= self.analysis_cache_size:
+            self.analysis_cache.pop(next(iter(self.analysis_cache)))
+        self.analysis_cache[cache_key] = (time.monotonic(), analysis)
+    
+    def _prune_cached_analyses(self):
+        """Delete on-disk cache entries older than the cache TTL"""
+        if not self.analysis_cache_dir:
+            return
+        try:
+            with os.scandir(self.analysis_cache_dir) as entries:
+                for entry in entries:
+                    if entry.name.endswith('.json') and time.time() - entry.stat().st_mtime >= self.analysis_cache_ttl:
+                        os.remove(entry.path)
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            logger.warning(f"Could not prune analysis cache: {str(e)}")
+    
+    def _load_cached_analysis(self, cache_key):
+        """Return a (structured_data, interpretation) pair cached on disk, or None if missing or expired"""
+        if not self.analysis_cache_dir:
+            return None
+        path = os.path.join(self.analysis_cache_dir, f"{cache_key}.json")
+        try:
+            if time.time() - os.path.getmtime(path) >= self.analysis_cache_ttl:
+                os.remove(path)
+                return None
+            with open(path, 'rb') as f:
+                entry = _json_loads(f.read())
+            return entry['tests'], entry['interpretation']
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            logger.warning(f"Ignoring unreadable analysis cache entry: {str(e)}")
+            return None
+    
+    def _store_cached_analysis(self, cache_key, structured_data, interpretation_text):
+        """Persist a successful analysis so it survives app restarts, if the disk cache is enabled"""
+        if not self.analysis_cache_dir:
+            return
+        path = os.path.join(self.analysis_cache_dir, f"{cache_key}.json")
+        try:
+            os.makedirs(self.analysis_cache_dir, exist_ok=True)
+            # Write to a temporary file first so readers never see a partial entry
+            tmp_path = f"{path}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump({"tests": structured_data, "interpretation": interpretation_text}, f)
+            os.replace(tmp_path, path)
+        except Exception as e:
+            logger.warning(f"Could not write analysis cache entry: {str(e)}")
+    
+    def _generate_streamed(self, model, prompt, progress_callback=None, **kwargs):
+        """Stream a model response, retrying transient API errors with backoff"""
+        from google.api_core import exceptions as google_exceptions
+        
+        transient_errors = (
+            google_exceptions.ResourceExhausted,
+            google_exceptions.ServiceUnavailable,
+            google_exceptions.DeadlineExceeded,
+            google_exceptions.InternalServerError,
+        )
+        
+        for attempt in range(MAX_RETRIES + 1):
+            try:
+                return self._read_stream(model, prompt, progress_callback, **kwargs)
+            except transient_errors as e:
+                if attempt == MAX_RETRIES:
+                    raise
+                # Exponential backoff with full jitter
+                delay = random.uniform(0, min(RETRY_MAX_DELAY, RETRY_BASE_DELAY * 2 ** attempt))
+                logger.warning(f"Transient model error ({str(e)}), retrying in {delay:.1f}s")
+                time.sleep(delay)
+    
+    def _read_stream(self, model, prompt, progress_callback=None, **kwargs):
+        """Stream a model response and return its full text"""
+        chunks = []
+        received = 0
+        for chunk in model.generate_content(prompt, stream=True, **kwargs):
+            text = chunk.text
+            chunks.append(text)
+            received += len(text)
+            if progress_callback:
+                progress_callback(received)
+        return ''.join(chunks)
+   
     def _generate_fallback_data(self):
         """Generate fallback structured data when AI analysis fails"""
         # Create some basic fallback data
@@ -360,10 +607,45 @@ class AdvancedReportAnalyzer:
         Note: This is a fallback interpretation generated when our AI analysis system encounters difficulties. It is not based on your specific lab results.
         """
    
-    def _prepare_interpretation_prompt(self, text):
-        """Generate enhanced interpretation prompt with medical context"""
+    def _limit_report_text(self, text):
+        """Collapse whitespace and keep oversized reports within the prompt budget by selecting result sections or lab value lines"""
+        text = BLANK_LINES_RE.sub("\n\n", INLINE_SPACE_RE.sub(" ", text)).strip()
+        if len(text) <= MAX_REPORT_CHARS:
+            return text
+        original_length = len(text)
+        
+        # Structured reports already group their results; send just those sections
+        try:
+            sections = _get_report_parser().parse_medical_report(text).get('sections', {})
+        except Exception as e:
+            logger.warning(f"Could not split report into sections: {str(e)}")
+            sections = {}
+        relevant = "\n\n".join(sections[name] for name in PROMPT_SECTIONS if sections.get(name))
+        if relevant:
+            text = relevant
+            if len(text) <= MAX_REPORT_CHARS:
+                logger.info(f"Report text reduced from {original_length} to {len(text)} characters of result sections")
+                return text
+        
+        lines = text.splitlines()
+        keep = set()
+        for i, line in enumerate(lines):
+            if LAB_VALUE_RE.search(line):
+                keep.update(range(max(0, i - LAB_VALUE_CONTEXT_LINES),
+                                  min(len(lines), i + LAB_VALUE_CONTEXT_LINES + 1)))
+        
+        filtered = "\n".join(lines[i] for i in sorted(keep)) if keep else text
+        logger.info(f"Report text reduced from {original_length} to {min(len(filtered), MAX_REPORT_CHARS)} characters")
+        return filtered[:MAX_REPORT_CHARS]
+    
+    def _prepare_analysis_prompt(self, text):
+        """Generate combined interpretation and extraction prompt with medical context"""
         return f"""
-        Analyze the following lab report and provide a comprehensive medical interpretation. Format the response as follows:
+        Analyze the following lab report. Return a single JSON object with exactly two keys:
+        "interpretation" and "tests".
+
+
+        "interpretation": A comprehensive medical interpretation as plain text, formatted as follows:
 
 
         EXECUTIVE SUMMARY
@@ -397,18 +679,10 @@ class AdvancedReportAnalyzer:
         - Supplements to consider (if applicable)
 
 
-        Format with clear headers and bullet points. Prioritize actionable insights.
+        Use clear headers and bullet points. Prioritize actionable insights.
 
 
-        Lab Report Text:
-        {text}
-        """
-    
-    def _prepare_extraction_prompt(self, text):
-        """Generate enhanced extraction prompt with medical context"""
-        return f"""
-        Extract key lab test parameters from the following lab report as structured data in JSON format.
-        For each test include:
+        "tests": An array with one object per lab test parameter in the report. For each test include:
         1. "Test": The name of the test
         2. "Value": The numerical value with unit (e.g., "10 g/dL")
         3. "ReferenceRange": The normal reference range
@@ -439,23 +713,8 @@ class AdvancedReportAnalyzer:
                 return f"This test measures {high_interp.split('is higher')[0].strip()}. " + \
                        "Abnormal results may indicate various conditions and should be discussed with your healthcare provider."
         
-        # Fallback generic interpretations for common test types
-        generic_interpretations = {
-            "Glucose": "This test measures your blood sugar levels. Abnormal results may indicate issues with blood sugar regulation.",
-            "HbA1c": "This test shows your average blood sugar level over the past 2-3 months.",
-            "Cholesterol": "This test measures blood fats that can affect your heart health.",
-            "HDL": "This measures 'good' cholesterol that helps remove other forms of cholesterol from your bloodstream.",
-            "LDL": "This measures 'bad' cholesterol that can build up in your arteries.",
-            "Triglycerides": "This measures a type of fat in your blood that can affect heart health.",
-            "Hemoglobin": "This measures the oxygen-carrying protein in your blood.",
-            "Iron": "This measures the iron levels in your blood, which is important for producing red blood cells.",
-            "Vitamin D": "This measures vitamin D levels, which is important for bone health and immune function.",
-            "TSH": "This measures thyroid stimulating hormone, which indicates thyroid function.",
-            "Creatinine": "This measures kidney function by checking how well your kidneys filter waste."
-        }
-        
-        # Look for partial matches in test name
-        for key, value in generic_interpretations.items():
+        # Fallback to common test types, matching on test name
+        for key, value in FALLBACK_INTERPRETATIONS.items():
             if key.lower() in test_name.lower():
                 return value
         
@@ -472,33 +731,8 @@ class AdvancedReportAnalyzer:
                     all_recs.extend(status_recs.split('\n'))
                 return list(set(all_recs))  # Remove duplicates
         
-        # Fallback generic recommendations for common test types
-        generic_recommendations = {
-            "Glucose": [
-                "Monitor your blood sugar levels as recommended",
-                "Follow a balanced diet low in simple sugars",
-                "Engage in regular physical activity",
-                "Maintain a healthy weight",
-                "Take medications as prescribed"
-            ],
-            "HbA1c": [
-                "Work with your healthcare provider on diabetes management",
-                "Monitor blood sugar levels regularly",
-                "Follow a balanced diet",
-                "Exercise regularly",
-                "Take medications as prescribed"
-            ],
-            "Cholesterol": [
-                "Follow a heart-healthy diet",
-                "Exercise regularly",
-                "Maintain a healthy weight",
-                "Avoid smoking",
-                "Limit alcohol consumption"
-            ]
-        }
-        
-        # Look for partial matches in test name
-        for key, value in generic_recommendations.items():
+        # Fallback to common test types, matching on test name
+        for key, value in FALLBACK_RECOMMENDATIONS.items():
             if key.lower() in test_name.lower():
                 return value
         
@@ -517,44 +751,51 @@ class AdvancedReportAnalyzer:
                 categories = df['Category'].unique().tolist()
                 selected_category = st.selectbox("Filter by Category", ["All Categories"] + categories)
                 
-                filtered_df = df.copy()
+                filtered_df = df
                 if selected_category != "All Categories":
-                    filtered_df = filtered_df[filtered_df['Category'] == selected_category]
+                    filtered_df = df[df['Category'] == selected_category]
                 
-                for category in filtered_df['Category'].unique():
+                # Group once rather than re-filtering the frame for every category
+                for category, category_df in filtered_df.groupby('Category', sort=False):
                     with st.expander(f"📊 {category} Panel", expanded=True):
-                        category_df = filtered_df[filtered_df['Category'] == category]
-                        for _, row in category_df.iterrows():
+                        for row in category_df.to_dict('records'):
                             with st.container():
                                 col1, col2 = st.columns([1, 1])
                                 with col1:
-                                    st.markdown(f"### {row['Test']}")
-                                    value_color = ('🔴' if row['Status'] == 'High' else '🔵' if row['Status'] == 'Low' else '🟢')
-                                    st.markdown(f"{value_color} **Current Value:** {row['Value']}")
-                                    st.markdown(f"**Normal Range:** {row['ReferenceRange']}")
+                                    value_color = STATUS_ICONS.get(row['Status'], '🟢')
+                                    # One markdown element per column keeps the element count down
+                                    st.markdown(
+                                        f"### {row['Test']}\n\n"
+                                        f"{value_color} **Current Value:** {row['Value']}\n\n"
+                                        f"**Normal Range:** {row['ReferenceRange']}"
+                                    )
                                 with col2:
                                     if row['Status'] != 'Normal':
                                         severity = row.get('Severity', 'Moderate')
-                                        st.markdown(f"**Severity:** {severity}")
-                                        st.markdown("**What this means:**")
-                                        # Use class's own interpretation method
+                                        # Use class's own interpretation and recommendations methods
                                         interpretation = self.generate_layman_interpretation(
                                             row['Test'], 
                                             row['Status'],
                                             severity
                                         )
-                                        st.markdown(interpretation)
-                                        st.markdown("**Recommendations:**")
-                                        # Use class's own recommendations method
                                         recommendations = self.generate_recommendations(
                                             row['Test'],
                                             row['Status']
                                         )
-                                        st.markdown(recommendations)
+                                        details = [
+                                            f"**Severity:** {severity}",
+                                            "**What this means:**",
+                                            interpretation,
+                                            "**Recommendations:**",
+                                            recommendations
+                                        ]
                                     else:
-                                        st.markdown("✅ **Result is within normal range**")
-                                        st.markdown("Continue maintaining your healthy lifestyle and regular check-ups.")
-                                    st.markdown("---")
+                                        details = [
+                                            "✅ **Result is within normal range**",
+                                            "Continue maintaining your healthy lifestyle and regular check-ups."
+                                        ]
+                                    details.append("---")
+                                    st.markdown("\n\n".join(details))
             else:
                 st.dataframe(df, use_container_width=True)
         except Exception as e:
@@ -5,147 +5,433 @@ import logging
 import traceback
 import re
 from io import BytesIO
-import pandas as pd
-import numpy as np
 from datetime import datetime
-import fitz  # PyMuPDF
-import matplotlib
-matplotlib.use('Agg')  # Use non-interactive backend
-import matplotlib.pyplot as plt
-from matplotlib.backends.backend_pdf import PdfPages
+from collections import defaultdict
 from reportlab.lib.pagesizes import letter
 from reportlab.lib.units import inch
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle, StyleSheet1
-from reportlab.lib.colors import HexColor, Color
+from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+from reportlab.lib.colors import HexColor
 from reportlab.platypus import (
     SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle, PageBreak,
-    Image, Flowable, Frame, PageTemplate, NextPageTemplate, KeepTogether
+    Image, Frame, PageTemplate
 )
 from reportlab.pdfgen import canvas
-from reportlab.graphics.shapes import Drawing, Circle, Wedge, String, Rect
-from reportlab.graphics.charts.barcharts import VerticalBarChart
-from reportlab.graphics.charts.piecharts import Pie
-from reportlab.graphics.charts.linecharts import HorizontalLineChart
-from reportlab.lib.enums import TA_LEFT, TA_CENTER, TA_RIGHT
-import json
+from reportlab.lib.enums import TA_CENTER
+from functools import lru_cache
 
 # Set up logging
 logger = logging.getLogger("HealthLensAI.PremiumReportGenerator")
 
+# Define colors
+REPORTLAB_COLORS = {
+    'primary': HexColor('#2c3e50'),
+    'secondary': HexColor('#34495e'),
+    'text_dark': HexColor('#2c3c50'),
+    'text_light': HexColor('#ffffff'),
+    'border': HexColor('#bdc3c7'),
+    'light_bg': HexColor('#ecf0f1'),
+    'warning': HexColor('#e74c3c'),
+    'success': HexColor('#2ecc71'),
+    'chart1': HexColor('#3498db'),
+    'chart2': HexColor('#2ecc71'),
+    'chart3': HexColor('#f1c40f'),
+    'chart4': HexColor('#e74c3c'),
+    'chart5': HexColor('#9b59b6')
+}
+
+# Define fonts
+FONTS = {
+    'heading': 'Helvetica-Bold',
+    'body': 'Helvetica'
+}
+
+# Cover page patient details
+PATIENT_TABLE_STYLE = TableStyle([
+    ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
+    ('FONTNAME', (0, 0), (-1, 0), FONTS['heading']),
+    ('FONTNAME', (0, 2), (-1, 2), FONTS['heading']),
+    ('FONTNAME', (0, 1), (-1, 1), FONTS['body']),
+    ('FONTNAME', (0, 3), (-1, 3), FONTS['body']),
+    ('FONTSIZE', (0, 0), (-1, 0), 12),
+    ('FONTSIZE', (0, 2), (-1, 2), 12),
+    ('FONTSIZE', (0, 1), (-1, 1), 14),
+    ('FONTSIZE', (0, 3), (-1, 3), 14),
+    ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
+    ('BOTTOMPADDING', (0, 2), (-1, 2), 12),
+    ('TOPPADDING', (0, 0), (-1, 0), 12),
+    ('TOPPADDING', (0, 2), (-1, 2), 12),
+])
+
+# Two-row "Patient ID / Date of Collection" section headers
+HEADER_TABLE_STYLE = TableStyle([
+    ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
+    ('FONTNAME', (0, 0), (-1, 0), FONTS['heading']),
+    ('FONTNAME', (0, 1), (-1, 1), FONTS['body']),
+    ('FONTSIZE', (0, 0), (-1, 0), 10),
+    ('FONTSIZE', (0, 1), (-1, 1), 10),
+    ('BOTTOMPADDING', (0, 0), (-1, 0), 6),
+    ('TOPPADDING', (0, 0), (-1, 0), 6),
+])
+
+# Table of contents
+TOC_TABLE_STYLE = TableStyle([
+    ('ALIGN', (0, 0), (0, -1), 'CENTER'),
+    ('ALIGN', (2, 0), (2, -1), 'CENTER'),
+    ('FONTNAME', (0, 0), (-1, 0), FONTS['heading']),
+    ('FONTNAME', (0, 1), (-1, -1), FONTS['body']),
+    ('FONTSIZE', (0, 0), (-1, 0), 10),
+    ('FONTSIZE', (0, 1), (-1, -1), 10),
+    ('BOTTOMPADDING', (0, 0), (-1, -1), 8),
+    ('TOPPADDING', (0, 0), (-1, -1), 8),
+    ('GRID', (0, 0), (-1, -1), 0.5, REPORTLAB_COLORS['border']),
+])
+
+# Lab results table with a shaded header row
+RESULTS_TABLE_STYLE = TableStyle([
+    ('BACKGROUND', (0, 0), (-1, 0), REPORTLAB_COLORS['primary']),
+    ('TEXTCOLOR', (0, 0), (-1, 0), REPORTLAB_COLORS['text_light']),
+    ('ALIGN', (0, 0), (-1, 0), 'CENTER'),
+    ('FONTNAME', (0, 0), (-1, 0), FONTS['heading']),
+    ('FONTSIZE', (0, 0), (-1, 0), 10),
+    ('BOTTOMPADDING', (0, 0), (-1, 0), 8),
+    ('GRID', (0, 0), (-1, -1), 0.5, REPORTLAB_COLORS['border']),
+    ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+    ('FONTNAME', (0, 1), (-1, -1), FONTS['body']),
+    ('FONTSIZE', (0, 1), (-1, -1), 9),
+    ('TOPPADDING', (0, 1), (-1, -1), 4),
+    ('BOTTOMPADDING', (0, 1), (-1, -1), 4),
+])
+
+# Do's and don'ts style guidance tables
+GUIDANCE_TABLE_STYLE = TableStyle([
+    ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
+    ('FONTNAME', (0, 0), (-1, 0), FONTS['heading']),
+    ('FONTSIZE', (0, 0), (-1, 0), 12),
+    ('BOTTOMPADDING', (0, 0), (-1, 0), 8),
+    ('TOPPADDING', (0, 0), (-1, 0), 8),
+    ('VALIGN', (0, 0), (-1, -1), 'TOP'),
+])
+
+# Wellbeing index physical measurements
+PHYSICAL_TABLE_STYLE = TableStyle([
+    ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
+    ('FONTNAME', (0, 0), (-1, 0), FONTS['heading']),
+    ('FONTNAME', (0, 2), (-1, 2), FONTS['heading']),
+    ('FONTNAME', (0, 1), (-1, 1), FONTS['body']),
+    ('FONTNAME', (0, 3), (-1, 3), FONTS['body']),
+    ('FONTSIZE', (0, 0), (-1, 0), 10),
+    ('FONTSIZE', (0, 2), (-1, 2), 10),
+    ('FONTSIZE', (0, 1), (-1, 1), 10),
+    ('FONTSIZE', (0, 3), (-1, 3), 10),
+    ('BOTTOMPADDING', (0, 0), (-1, 0), 8),
+    ('BOTTOMPADDING', (0, 2), (-1, 2), 8),
+    ('TOPPADDING', (0, 0), (-1, 0), 8),
+    ('TOPPADDING', (0, 2), (-1, 2), 8),
+])
+
+# Wellbeing index risk factors
+RISKS_TABLE_STYLE = TableStyle([
+    ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
+    ('FONTNAME', (0, 0), (-1, 0), FONTS['heading']),
+    ('FONTNAME', (0, 2), (-1, 2), FONTS['heading']),
+    ('FONTNAME', (0, 4), (-1, 4), FONTS['heading']),
+    ('FONTNAME', (0, 1), (-1, 1), FONTS['body']),
+    ('FONTNAME', (0, 3), (-1, 3), FONTS['body']),
+    ('FONTNAME', (0, 5), (-1, 5), FONTS['body']),
+    ('FONTSIZE', (0, 0), (-1, 0), 10),
+    ('FONTSIZE', (0, 2), (-1, 2), 10),
+    ('FONTSIZE', (0, 4), (-1, 4), 10),
+    ('FONTSIZE', (0, 1), (-1, 1), 10),
+    ('FONTSIZE', (0, 3), (-1, 3), 10),
+    ('FONTSIZE', (0, 5), (-1, 5), 10),
+    ('BOTTOMPADDING', (0, 0), (-1, 0), 8),
+    ('BOTTOMPADDING', (0, 2), (-1, 2), 8),
+    ('BOTTOMPADDING', (0, 4), (-1, 4), 8),
+    ('TOPPADDING', (0, 0), (-1, 0), 8),
+    ('TOPPADDING', (0, 2), (-1, 2), 8),
+    ('TOPPADDING', (0, 4), (-1, 4), 8),
+])
+
+# Wellbeing index lifestyle summary
+LIFESTYLE_TABLE_STYLE = TableStyle([
+    ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
+    ('FONTNAME', (0, 0), (-1, 0), FONTS['heading']),
+    ('FONTNAME', (0, 1), (-1, 1), FONTS['body']),
+    ('FONTSIZE', (0, 0), (-1, 0), 10),
+    ('FONTSIZE', (0, 1), (-1, 1), 10),
+    ('BOTTOMPADDING', (0, 0), (-1, 0), 8),
+    ('TOPPADDING', (0, 0), (-1, 0), 8),
+])
+
+# Upper-case interpretation headings, optionally wrapped in markdown (## / **)
+SECTION_HEADER_RE = re.compile(r"^[#*\s]*([A-Z][A-Z0-9 &/,()-]{5,}?)[*:\s]*$")
+
+# Substrings of test names mapped to their report category
+CATEGORY_MAPPING = {
+    "Hemoglobin": "Complete Blood Count",
+    "RBC": "Complete Blood Count",
+    "WBC": "Complete Blood Count",
+    "Platelets": "Complete Blood Count",
+    "Erythrocyte Sedimentation Rate": "Inflammatory markers",
+    "C-Reactive Protein": "Inflammatory markers",
+    "Iron": "Iron Studies",
+    "Ferritin": "Iron Studies",
+    "Transferrin": "Iron Studies",
+    "Glucose": "Diabetes Profile",
+    "HbA1c": "Diabetes Profile",
+    "Creatinine": "Kidney Function Test",
+    "BUN": "Kidney Function Test",
+    "eGFR": "Kidney Function Test",
+    "Sodium": "Kidney Function Test",
+    "Potassium": "Kidney Function Test",
+    "Cholesterol": "Lipid Profile",
+    "Triglycerides": "Lipid Profile",
+    "HDL": "Lipid Profile",
+    "LDL": "Lipid Profile",
+    "AST": "Liver Function Test",
+    "ALT": "Liver Function Test",
+    "Bilirubin": "Liver Function Test",
+    "Alkaline Phosphatase": "Liver Function Test",
+    "Calcium": "Calcium and Bone Health",
+    "Vitamin D": "Vitamin Profile",
+    "Vitamin B12": "Vitamin Profile",
+    "TSH": "Thyroid Function Test",
+    "T3": "Thyroid Function Test",
+    "T4": "Thyroid Function Test"
+}
+
+# Short descriptions shown under each category heading
+CATEGORY_DESCRIPTIONS = {
+    "Complete Blood Count": "Gives an insight into the health of blood and blood cells which are essential to carry out various bodily functions like transporting oxygen, fighting infections, and clotting blood after an injury.",
+    "Inflammatory markers": "Helps to understand presence of an inflammation in the body. Inflammation is bodies defence against infection or injury.",
+    "Iron Studies": "Iron is a vital mineral. It helps our blood cells to transport oxygen. Iron studies are used to assess level of iron in blood and blood's ability to attach itself to iron.",
+    "Diabetes Profile": "Measures the level of glucose in the body and helps identify the body's ability to process glucose. It can be used for screnning as well as monitoring the treatment of diabetes.",
+    "Kidney Function Test": "Performed to determine how well the kidneys are working. Kidneys regulate elimination of waste from our body and maintain electrolyte balance.",
+    "Lipid Profile": "Measures the amount of Cholesterol and Triglycerides in your blood. This gives an insight into the health of heart and blood vessels.",
+    "Liver Function Test": "Group of blood tests commonly performed to evaluate the function of the liver which is essential to digest food and removing toxins from the body.",
+    "Urine Routine & Microscopy": "Microscopic examination of urine sample to check for the presence of blood cells, crystals, bacteria, parasites, and cells from tumors in it.",
+    "Calcium and Bone Health": "Measures the levels of calcium and vitamin D in the blood which are responsible for keeping bones, teeth, and muscles healthy.",
+    "Vitamin Profile": "Vitamins are the essential nutrients for human life. This profile offers tests to check level of different types of vitamin B, vitamin D, vitamin E and vitamin K.",
+    "Thyroid Function Test": "Window to the health of the butterfly shaped gland - Thyroid, which detemines how the body uses energy.",
+    "Other Tests": "Additional laboratory tests that provide valuable information about your health status."
+}
+
+# Plain-language notes for abnormal results, matched on test name
+GENERIC_INTERPRETATIONS = {
+    "Glucose": "Elevated glucose levels may indicate diabetes or prediabetes. This suggests that your body is having difficulty regulating blood sugar levels.",
+    "HbA1c": "HbA1c measures your average blood sugar level over the past 2-3 months. Elevated levels indicate that your blood sugar has been consistently high, which is associated with diabetes.",
+    "Cholesterol": "Elevated total cholesterol may increase your risk of heart disease and stroke. It's important to maintain healthy cholesterol levels through diet, exercise, and sometimes medication.",
+    "HDL": "HDL is often called 'good' cholesterol. Low levels of HDL cholesterol may increase your risk of heart disease.",
+    "LDL": "LDL is often called 'bad' cholesterol. Elevated levels of LDL cholesterol may increase your risk of heart disease and stroke.",
+    "Triglycerides": "Elevated triglyceride levels may contribute to hardening of the arteries or thickening of the artery walls, which increases the risk of stroke, heart attack, and heart disease.",
+    "Hemoglobin": "Low hemoglobin levels may indicate anemia, which means you don't have enough red blood cells to carry adequate oxygen to your tissues.",
+    "Iron": "Low iron levels may lead to iron deficiency anemia. Iron is essential for producing hemoglobin, which carries oxygen in your blood.",
+    "Vitamin D": "Low vitamin D levels are common and may affect bone health, immune function, and overall health. Vitamin D is produced when your skin is exposed to sunlight.",
+    "TSH": "Abnormal TSH levels may indicate a thyroid disorder. The thyroid gland produces hormones that regulate metabolism.",
+    "Creatinine": "Elevated creatinine levels may indicate kidney problems. Creatinine is a waste product that your kidneys filter from your blood."
+}
+
+# Follow-up recommendations for abnormal results, matched on test name
+SPECIFIC_RECOMMENDATIONS = {
+    "Glucose": [
+        "Monitor your blood sugar levels regularly as recommended by your healthcare provider",
+        "Follow a balanced diet low in simple sugars and high in fiber",
+        "Engage in regular physical activity, aiming for at least 150 minutes of moderate exercise per week",
+        "Maintain a healthy weight or work toward weight loss if overweight",
+        "Take medications as prescribed by your healthcare provider"
+    ],
+    "HbA1c": [
+        "Work with your healthcare provider to develop a diabetes management plan",
+        "Monitor your blood sugar levels regularly",
+        "Follow a balanced diet with consistent carbohydrate intake throughout the day",
+        "Engage in regular physical activity",
+        "Take medications as prescribed"
+    ],
+    "Cholesterol": [
+        "Adopt a heart-healthy diet low in saturated and trans fats",
+        "Increase consumption of fruits, vegetables, whole grains, and lean proteins",
+        "Engage in regular physical activity",
+        "Maintain a healthy weight",
+        "Avoid smoking and limit alcohol consumption"
+    ],
+    "HDL": [
+        "Engage in regular aerobic exercise",
+        "Quit smoking if applicable",
+        "Maintain a healthy weight",
+        "Include healthy fats in your diet, such as olive oil, nuts, and avocados",
+        "Limit refined carbohydrates and added sugars"
+    ],
+    "LDL": [
+        "Reduce intake of saturated and trans fats",
+        "Increase consumption of soluble fiber from sources like oats, beans, and fruits",
+        "Consider plant sterols and stanols, which can help lower LDL cholesterol",
+        "Engage in regular physical activity",
+        "Take medications as prescribed by your healthcare provider"
+    ],
+    "Triglycerides": [
+        "Limit added sugars and refined carbohydrates",
+        "Reduce alcohol consumption",
+        "Choose omega-3 rich foods like fatty fish",
+        "Maintain a healthy weight",
+        "Engage in regular physical activity"
+    ],
+    "Hemoglobin": [
+        "Include iron-rich foods in your diet, such as lean meats, beans, and leafy greens",
+        "Pair iron-rich foods with vitamin C sources to enhance absorption",
+        "Avoid consuming calcium-rich foods or coffee/tea with iron-rich meals",
+        "Consider iron supplements if recommended by your healthcare provider",
+        "Follow up with your healthcare provider to monitor your hemoglobin levels"
+    ],
+    "Iron": [
+        "Include iron-rich foods in your diet",
+        "Consider iron supplements if recommended by your healthcare provider",
+        "Pair iron-rich foods with vitamin C sources to enhance absorption",
+        "Avoid consuming calcium-rich foods or coffee/tea with iron-rich meals",
+        "Follow up with your healthcare provider to monitor your iron levels"
+    ],
+    "Vitamin D": [
+        "Spend time outdoors in sunlight, but avoid sunburn",
+        "Include vitamin D-rich foods in your diet, such as fatty fish, egg yolks, and fortified foods",
+        "Consider vitamin D supplements if recommended by your healthcare provider",
+        "Follow up with your healthcare provider to monitor your vitamin D levels",
+        "Be aware that certain medications can affect vitamin D levels"
+    ],
+    "TSH": [
+        "Follow up with your healthcare provider for further evaluation",
+        "Take thyroid medications as prescribed, if applicable",
+        "Be consistent with the timing of thyroid medication",
+        "Inform your healthcare provider of all medications and supplements you are taking",
+        "Monitor for symptoms of thyroid dysfunction and report them to your healthcare provider"
+    ],
+    "Creatinine": [
+        "Stay well-hydrated",
+        "Follow a kidney-friendly diet if recommended by your healthcare provider",
+        "Monitor your blood pressure regularly",
+        "Avoid medications that can harm the kidneys, such as certain pain relievers",
+        "Follow up with your healthcare provider to monitor your kidney function"
+    ]
+}
+
+@lru_cache(maxsize=256)
+def _match_generic_interpretation(test_name):
+    """Find the interpretation whose key appears in the test name, memoized per name"""
+    lowered = test_name.lower()
+    for key, value in GENERIC_INTERPRETATIONS.items():
+        if key.lower() in lowered:
+            return value
+    return None
+
+@lru_cache(maxsize=256)
+def _match_specific_recommendations(test_name):
+    """Find the recommendations whose key appears in the test name, memoized per name"""
+    lowered = test_name.lower()
+    for key, value in SPECIFIC_RECOMMENDATIONS.items():
+        if key.lower() in lowered:
+            return value
+    return None
+
+@lru_cache(maxsize=1)
+def _build_stylesheet():
+    """Build the report stylesheet once; the styles are shared by every report"""
+    styles = getSampleStyleSheet()
+    
+    # Instead of adding new styles, modify existing ones or use unique names
+    # Modify existing Title style
+    styles['Title'].fontSize = 24
+    styles['Title'].leading = 28
+    styles['Title'].alignment = TA_CENTER
+    styles['Title'].spaceAfter = 12
+    
+    # Modify existing Normal style
+    styles['Normal'].spaceBefore = 6
+    styles['Normal'].spaceAfter = 6
+    
+    # Add custom styles with unique names
+    styles.add(ParagraphStyle(
+        name='ReportSubtitle',  # Changed from 'Subtitle'
+        fontName='Helvetica-Bold',
+        fontSize=18,
+        leading=22,
+        alignment=TA_CENTER,
+        spaceAfter=12
+    ))
+    
+    styles.add(ParagraphStyle(
+        name='ReportSectionTitle',  # Changed from 'SectionTitle'
+        fontName='Helvetica-Bold',
+        fontSize=14,
+        leading=18,
+        spaceBefore=12,
+        spaceAfter=6
+    ))
+    
+    styles.add(ParagraphStyle(
+        name='ReportBullet',  # Changed from 'Bullet'
+        fontName='Helvetica',
+        fontSize=10,
+        leading=14,
+        leftIndent=20,
+        bulletIndent=10,
+        spaceBefore=2,
+        spaceAfter=2
+    ))
+    
+    styles.add(ParagraphStyle(
+        name='ReportTableHeader',  # Changed from 'TableHeader'
+        fontName='Helvetica-Bold',
+        fontSize=10,
+        leading=12,
+        alignment=TA_CENTER
+    ))
+    
+    styles.add(ParagraphStyle(
+        name='ReportTableCell',  # Changed from 'TableCell'
+        fontName='Helvetica',
+        fontSize=9,
+        leading=12
+    ))
+    
+    styles.add(ParagraphStyle(
+        name='ReportCaption',  # Changed from 'Caption'
+        fontName='Helvetica-Oblique',
+        fontSize=8,
+        leading=10,
+        alignment=TA_CENTER
+    ))
+    
+    styles.add(ParagraphStyle(
+        name='ReportFooter',  # Changed from 'Footer'
+        fontName='Helvetica',
+        fontSize=8,
+        leading=10,
+        alignment=TA_CENTER
+    ))
+    
+    return styles
+
 class HealthReportGenerator:
     """Enhanced health report generator for comprehensive medical reports"""
     
     def __init__(self):
         """Initialize the report generator with styles and colors"""
-        self.styles = getSampleStyleSheet()
-        
-        # Define colors
-        self.reportlab_colors = {
-            'primary': HexColor('#2c3e50'),
-            'secondary': HexColor('#34495e'),
-            'text_dark': HexColor('#2c3c50'),
-            'text_light': HexColor('#ffffff'),
-            'border': HexColor('#bdc3c7'),
-            'light_bg': HexColor('#ecf0f1'),
-            'warning': HexColor('#e74c3c'),
-            'success': HexColor('#2ecc71'),
-            'chart1': HexColor('#3498db'),
-            'chart2': HexColor('#2ecc71'),
-            'chart3': HexColor('#f1c40f'),
-            'chart4': HexColor('#e74c3c'),
-            'chart5': HexColor('#9b59b6')
-        }
-        
-        # Define fonts
-        self.fonts = {
-            'heading': 'Helvetica-Bold',
-            'body': 'Helvetica'
-        }
-        
-        # Configure matplotlib to use a style that works
-        try:
-            plt.style.use('default')
-        except Exception as e:
-            logger.warning(f"Could not set matplotlib style: {str(e)}")
-        
-        # Instead of adding new styles, modify existing ones or use unique names
-        # Modify existing Title style
-        self.styles['Title'].fontSize = 24
-        self.styles['Title'].leading = 28
-        self.styles['Title'].alignment = TA_CENTER
-        self.styles['Title'].spaceAfter = 12
-        
-        # Modify existing Normal style
-        self.styles['Normal'].spaceBefore = 6
-        self.styles['Normal'].spaceAfter = 6
-        
-        # Add custom styles with unique names
-        self.styles.add(ParagraphStyle(
-            name='ReportSubtitle',  # Changed from 'Subtitle'
-            fontName='Helvetica-Bold',
-            fontSize=18,
-            leading=22,
-            alignment=TA_CENTER,
-            spaceAfter=12
-        ))
-        
-        self.styles.add(ParagraphStyle(
-            name='ReportSectionTitle',  # Changed from 'SectionTitle'
-            fontName='Helvetica-Bold',
-            fontSize=14,
-            leading=18,
-            spaceBefore=12,
-            spaceAfter=6
-        ))
-        
-        self.styles.add(ParagraphStyle(
-            name='ReportBullet',  # Changed from 'Bullet'
-            fontName='Helvetica',
-            fontSize=10,
-            leading=14,
-            leftIndent=20,
-            bulletIndent=10,
-            spaceBefore=2,
-            spaceAfter=2
-        ))
-        
-        self.styles.add(ParagraphStyle(
-            name='ReportTableHeader',  # Changed from 'TableHeader'
-            fontName='Helvetica-Bold',
-            fontSize=10,
-            leading=12,
-            alignment=TA_CENTER
-        ))
-        
-        self.styles.add(ParagraphStyle(
-            name='ReportTableCell',  # Changed from 'TableCell'
-            fontName='Helvetica',
-            fontSize=9,
-            leading=12
-        ))
-        
-        self.styles.add(ParagraphStyle(
-            name='ReportCaption',  # Changed from 'Caption'
-            fontName='Helvetica-Oblique',
-            fontSize=8,
-            leading=10,
-            alignment=TA_CENTER
-        ))
-        
-        self.styles.add(ParagraphStyle(
-            name='ReportFooter',  # Changed from 'Footer'
-            fontName='Helvetica',
-            fontSize=8,
-            leading=10,
-            alignment=TA_CENTER
-        ))
-
-    def create_pdf_report(self, patient_data, structured_data=None, interpretation=None, visualization_data=None):
-        """Create a comprehensive health report PDF"""
+        self.styles = _build_stylesheet()
+        self.reportlab_colors = REPORTLAB_COLORS
+        self.fonts = FONTS
+    
+    def create_pdf_report(self, patient_data, structured_data=None, interpretation=None, visualization_data=None, stream=None):
+        """
+        Create a comprehensive health report PDF
+        
+        If a writable binary stream is given the PDF is written directly to it
+        and the stream is returned; otherwise the PDF is returned as bytes.
+        Errors are raised to a stream-providing caller, since the stream may
+        already hold a partial document; without a stream an error PDF is
+        returned instead.
+        """
         buffer = None
         temp_files = []  # Keep track of temp files
         try:
-            buffer = BytesIO()
+            buffer = stream if stream is not None else BytesIO()
             
             # Create document
             doc = SimpleDocTemplate(
@@ -158,7 +444,8 @@ class HealthReportGenerator:
                 title=f"Health Report - {patient_data.get('Name', 'Patient')}",
                 author="HealthLensAI",
                 subject="Medical Lab Report Analysis",
-                keywords="health, medical, lab, report, analysis"
+                keywords="health, medical, lab, report, analysis",
+                pageCompression=1  # zlib-compress page streams regardless of rl_config
             )
             
             # Create page templates with headers and footers
@@ -264,14 +551,18 @@ class HealthReportGenerator:
             
             # Build the document
             doc.build(content)
+            if stream is not None:
+                return stream
             pdf_content = buffer.getvalue()
             return pdf_content
         except Exception as e:
             logger.error(f"Error generating PDF: {str(e)}\n{traceback.format_exc()}")
+            if stream is not None:
+                raise
             return self._create_error_pdf(patient_data, str(e))
         finally:
-            # Clean up resources
-            if buffer:
+            # Clean up resources (a caller-provided stream stays open)
+            if buffer is not None and buffer is not stream:
                 buffer.close()
             for temp_file in temp_files:
                 try:
@@ -366,32 +657,18 @@ class HealthReportGenerator:
         content.append(Spacer(1, 0.5*inch))
         
         # Add patient information
+        today = datetime.now().strftime('%d/%m/%Y')
         patient_info = [
             ["Prepared for", "Basic Info", "Patient ID"],
             [f"{patient_data.get('Name', 'Patient')}", 
              f"{patient_data.get('Gender', '')} / {patient_data.get('Age', '')} Yrs", 
              f"{patient_data.get('Patient ID', '')}"],
             ["Report released on", "Date of Test", ""],
-            [f"{datetime.now().strftime('%d/%m/%Y')}", 
-             f"{patient_data.get('Test Date', datetime.now().strftime('%d/%m/%Y'))}", ""]
+            [today, f"{patient_data.get('Test Date', today)}", ""]
         ]
         
         patient_table = Table(patient_info, colWidths=[2*inch, 2*inch, 2*inch])
-        patient_table.setStyle(TableStyle([
-            ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-            ('FONTNAME', (0, 0), (-1, 0), self.fonts['heading']),
-            ('FONTNAME', (0, 2), (-1, 2), self.fonts['heading']),
-            ('FONTNAME', (0, 1), (-1, 1), self.fonts['body']),
-            ('FONTNAME', (0, 3), (-1, 3), self.fonts['body']),
-            ('FONTSIZE', (0, 0), (-1, 0), 12),
-            ('FONTSIZE', (0, 2), (-1, 2), 12),
-            ('FONTSIZE', (0, 1), (-1, 1), 14),
-            ('FONTSIZE', (0, 3), (-1, 3), 14),
-            ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-            ('BOTTOMPADDING', (0, 2), (-1, 2), 12),
-            ('TOPPADDING', (0, 0), (-1, 0), 12),
-            ('TOPPADDING', (0, 2), (-1, 2), 12),
-        ]))
+        patient_table.setStyle(PATIENT_TABLE_STYLE)
         
         content.append(patient_table)
         content.append(Spacer(1, 1*inch))
@@ -403,15 +680,7 @@ class HealthReportGenerator:
         ]
         
         id_date_table = Table(id_date, colWidths=[3*inch, 3*inch])
-        id_date_table.setStyle(TableStyle([
-            ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-            ('FONTNAME', (0, 0), (-1, 0), self.fonts['heading']),
-            ('FONTNAME', (0, 1), (-1, 1), self.fonts['body']),
-            ('FONTSIZE', (0, 0), (-1, 0), 10),
-            ('FONTSIZE', (0, 1), (-1, 1), 10),
-            ('BOTTOMPADDING', (0, 0), (-1, 0), 6),
-            ('TOPPADDING', (0, 0), (-1, 0), 6),
-        ]))
+        id_date_table.setStyle(HEADER_TABLE_STYLE)
         
         content.append(id_date_table)
         
@@ -443,17 +712,7 @@ class HealthReportGenerator:
         ]
         
         toc_table = Table(toc_data, colWidths=[0.7*inch, 4*inch, 1*inch])
-        toc_table.setStyle(TableStyle([
-            ('ALIGN', (0, 0), (0, -1), 'CENTER'),
-            ('ALIGN', (2, 0), (2, -1), 'CENTER'),
-            ('FONTNAME', (0, 0), (-1, 0), self.fonts['heading']),
-            ('FONTNAME', (0, 1), (-1, -1), self.fonts['body']),
-            ('FONTSIZE', (0, 0), (-1, 0), 10),
-            ('FONTSIZE', (0, 1), (-1, -1), 10),
-            ('BOTTOMPADDING', (0, 0), (-1, -1), 8),
-            ('TOPPADDING', (0, 0), (-1, -1), 8),
-            ('GRID', (0, 0), (-1, -1), 0.5, self.reportlab_colors['border']),
-        ]))
+        toc_table.setStyle(TOC_TABLE_STYLE)
         
         content.append(toc_table)
         content.append(Spacer(1, 0.3*inch))
@@ -489,15 +748,7 @@ class HealthReportGenerator:
         ]
         
         header_table = Table(header, colWidths=[3*inch, 3*inch])
-        header_table.setStyle(TableStyle([
-            ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-            ('FONTNAME', (0, 0), (-1, 0), self.fonts['heading']),
-            ('FONTNAME', (0, 1), (-1, 1), self.fonts['body']),
-            ('FONTSIZE', (0, 0), (-1, 0), 10),
-            ('FONTSIZE', (0, 1), (-1, 1), 10),
-            ('BOTTOMPADDING', (0, 0), (-1, 0), 6),
-            ('TOPPADDING', (0, 0), (-1, 0), 6),
-        ]))
+        header_table.setStyle(HEADER_TABLE_STYLE)
         
         content.append(header_table)
         content.append(Spacer(1, 0.2*inch))
@@ -530,31 +781,14 @@ class HealthReportGenerator:
                 
                 # Create table for this category
                 table_data = [["Test Name", "Result", "Bio. Ref. Interval", "Trends (For last three tests)"]]
-                
-                for test in tests:
-                    row = [
-                        test.get('Test', ''),
-                        f"{test.get('Value', '')}",
-                        test.get('ReferenceRange', ''),
-                        "--- --- ---"  # Placeholder for trends
-                    ]
-                    table_data.append(row)
+                table_data.extend(
+                    [test.get('Test', ''), str(test.get('Value', '')), test.get('ReferenceRange', ''),
+                     "--- --- ---"]  # Placeholder for trends
+                    for test in tests
+                )
                 
                 table = Table(table_data, colWidths=[2*inch, 1*inch, 1.5*inch, 2*inch])
-                table.setStyle(TableStyle([
-                    ('BACKGROUND', (0, 0), (-1, 0), self.reportlab_colors['primary']),
-                    ('TEXTCOLOR', (0, 0), (-1, 0), self.reportlab_colors['text_light']),
-                    ('ALIGN', (0, 0), (-1, 0), 'CENTER'),
-                    ('FONTNAME', (0, 0), (-1, 0), self.fonts['heading']),
-                    ('FONTSIZE', (0, 0), (-1, 0), 10),
-                    ('BOTTOMPADDING', (0, 0), (-1, 0), 8),
-                    ('GRID', (0, 0), (-1, -1), 0.5, self.reportlab_colors['border']),
-                    ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
-                    ('FONTNAME', (0, 1), (-1, -1), self.fonts['body']),
-                    ('FONTSIZE', (0, 1), (-1, -1), 9),
-                    ('TOPPADDING', (0, 1), (-1, -1), 4),
-                    ('BOTTOMPADDING', (0, 1), (-1, -1), 4),
-                ]))
+                table.setStyle(RESULTS_TABLE_STYLE)
                 
                 content.append(table)
                 content.append(Spacer(1, 0.2*inch))
@@ -576,15 +810,7 @@ class HealthReportGenerator:
         ]
         
         header_table = Table(header, colWidths=[3*inch, 3*inch])
-        header_table.setStyle(TableStyle([
-            ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-            ('FONTNAME', (0, 0), (-1, 0), self.fonts['heading']),
-            ('FONTNAME', (0, 1), (-1, 1), self.fonts['body']),
-            ('FONTSIZE', (0, 0), (-1, 0), 10),
-            ('FONTSIZE', (0, 1), (-1, 1), 10),
-            ('BOTTOMPADDING', (0, 0), (-1, 0), 6),
-            ('TOPPADDING', (0, 0), (-1, 0), 6),
-        ]))
+        header_table.setStyle(HEADER_TABLE_STYLE)
         
         content.append(header_table)
         content.append(Spacer(1, 0.2*inch))
@@ -613,21 +839,7 @@ class HealthReportGenerator:
         ]
         
         physical_table = Table(physical_data, colWidths=[2*inch, 2*inch, 2*inch])
-        physical_table.setStyle(TableStyle([
-            ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-            ('FONTNAME', (0, 0), (-1, 0), self.fonts['heading']),
-            ('FONTNAME', (0, 2), (-1, 2), self.fonts['heading']),
-            ('FONTNAME', (0, 1), (-1, 1), self.fonts['body']),
-            ('FONTNAME', (0, 3), (-1, 3), self.fonts['body']),
-            ('FONTSIZE', (0, 0), (-1, 0), 10),
-            ('FONTSIZE', (0, 2), (-1, 2), 10),
-            ('FONTSIZE', (0, 1), (-1, 1), 10),
-            ('FONTSIZE', (0, 3), (-1, 3), 10),
-            ('BOTTOMPADDING', (0, 0), (-1, 0), 8),
-            ('BOTTOMPADDING', (0, 2), (-1, 2), 8),
-            ('TOPPADDING', (0, 0), (-1, 0), 8),
-            ('TOPPADDING', (0, 2), (-1, 2), 8),
-        ]))
+        physical_table.setStyle(PHYSICAL_TABLE_STYLE)
         
         content.append(physical_table)
         content.append(Spacer(1, 0.3*inch))
@@ -648,27 +860,7 @@ class HealthReportGenerator:
         ]
         
         risks_table = Table(risks_data, colWidths=[2*inch, 2*inch, 2*inch])
-        risks_table.setStyle(TableStyle([
-            ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-            ('FONTNAME', (0, 0), (-1, 0), self.fonts['heading']),
-            ('FONTNAME', (0, 2), (-1, 2), self.fonts['heading']),
-            ('FONTNAME', (0, 4), (-1, 4), self.fonts['heading']),
-            ('FONTNAME', (0, 1), (-1, 1), self.fonts['body']),
-            ('FONTNAME', (0, 3), (-1, 3), self.fonts['body']),
-            ('FONTNAME', (0, 5), (-1, 5), self.fonts['body']),
-            ('FONTSIZE', (0, 0), (-1, 0), 10),
-            ('FONTSIZE', (0, 2), (-1, 2), 10),
-            ('FONTSIZE', (0, 4), (-1, 4), 10),
-            ('FONTSIZE', (0, 1), (-1, 1), 10),
-            ('FONTSIZE', (0, 3), (-1, 3), 10),
-            ('FONTSIZE', (0, 5), (-1, 5), 10),
-            ('BOTTOMPADDING', (0, 0), (-1, 0), 8),
-            ('BOTTOMPADDING', (0, 2), (-1, 2), 8),
-            ('BOTTOMPADDING', (0, 4), (-1, 4), 8),
-            ('TOPPADDING', (0, 0), (-1, 0), 8),
-            ('TOPPADDING', (0, 2), (-1, 2), 8),
-            ('TOPPADDING', (0, 4), (-1, 4), 8),
-        ]))
+        risks_table.setStyle(RISKS_TABLE_STYLE)
         
         content.append(risks_table)
         content.append(Spacer(1, 0.2*inch))
@@ -690,15 +882,7 @@ class HealthReportGenerator:
         ]
         
         lifestyle_table = Table(lifestyle_data, colWidths=[3*inch, 3*inch])
-        lifestyle_table.setStyle(TableStyle([
-            ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-            ('FONTNAME', (0, 0), (-1, 0), self.fonts['heading']),
-            ('FONTNAME', (0, 1), (-1, 1), self.fonts['body']),
-            ('FONTSIZE', (0, 0), (-1, 0), 10),
-            ('FONTSIZE', (0, 1), (-1, 1), 10),
-            ('BOTTOMPADDING', (0, 0), (-1, 0), 8),
-            ('TOPPADDING', (0, 0), (-1, 0), 8),
-        ]))
+        lifestyle_table.setStyle(LIFESTYLE_TABLE_STYLE)
         
         content.append(lifestyle_table)
         
@@ -801,9 +985,19 @@ class HealthReportGenerator:
                 else:
                     interpretation_text = str(interpretation)
                 
-                sections = interpretation_text.split('\n\n')
-                for section in sections:
-                    if section.strip():
+                for section in interpretation_text.split('\n\n'):
+                    section = section.strip()
+                    if not section:
+                        continue
+                    
+                    # All-caps first lines ("EXECUTIVE SUMMARY") become section headings
+                    first_line, _, rest = section.partition('\n')
+                    header_match = SECTION_HEADER_RE.match(first_line)
+                    if header_match:
+                        content.append(Paragraph(header_match.group(1), self.styles['ReportSectionTitle']))
+                        section = rest.strip()
+                    
+                    if section:
                         para = Paragraph(section, self.styles['Normal'])
                         content.append(para)
                 content.append(Spacer(1, 0.1*inch))
@@ -878,6 +1072,55 @@ class HealthReportGenerator:
         content.append(PageBreak())
         return content
     
+    def _create_lab_analysis_section(self, structured_data):
+        """Create lab results tables grouped by category"""
+        content = []
+        
+        # Add section title
+        title = Paragraph("Lab Results by Category", self.styles['ReportSectionTitle'])
+        content.append(title)
+        content.append(Spacer(1, 0.1*inch))
+        
+        # Group tests by category in a single pass
+        tests_by_category = defaultdict(list)
+        for test in structured_data:
+            tests_by_category[test.get('Category', 'Other Tests')].append(test)
+        
+        header = ["Test", "Value", "Reference Range", "Status"]
+        for category, tests in tests_by_category.items():
+            category_title = Paragraph(category, self.styles['ReportSectionTitle'])
+            content.append(category_title)
+            
+            table_data = [header] + [
+                [test.get('Test', ''), str(test.get('Value', '')),
+                 test.get('ReferenceRange', ''), test.get('Status', '')]
+                for test in tests
+            ]
+            
+            table = Table(table_data, colWidths=[2.5*inch, 1.5*inch, 2*inch, 1*inch], repeatRows=1)
+            table_style = [
+                ('BACKGROUND', (0, 0), (-1, 0), self.reportlab_colors['primary']),
+                ('TEXTCOLOR', (0, 0), (-1, 0), self.reportlab_colors['text_light']),
+                ('FONTNAME', (0, 0), (-1, 0), self.fonts['heading']),
+                ('FONTNAME', (0, 1), (-1, -1), self.fonts['body']),
+                ('FONTSIZE', (0, 0), (-1, -1), 9),
+                ('BOTTOMPADDING', (0, 0), (-1, -1), 4),
+                ('TOPPADDING', (0, 0), (-1, -1), 4),
+                ('GRID', (0, 0), (-1, -1), 0.5, self.reportlab_colors['border']),
+            ]
+            # Highlight abnormal results
+            table_style.extend(
+                ('TEXTCOLOR', (3, row), (3, row), self.reportlab_colors['warning'])
+                for row, test in enumerate(tests, start=1)
+                if test.get('Status', '') != 'Normal'
+            )
+            table.setStyle(TableStyle(table_style))
+            content.append(table)
+            content.append(Spacer(1, 0.2*inch))
+        
+        content.append(PageBreak())
+        return content
+    
     def _create_health_recommendations(self, structured_data):
         """Create health recommendations section"""
         content = []
@@ -916,14 +1159,7 @@ class HealthReportGenerator:
         ]
         
         dos_donts_table = Table(dos_donts, colWidths=[3*inch, 3*inch])
-        dos_donts_table.setStyle(TableStyle([
-            ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-            ('FONTNAME', (0, 0), (-1, 0), self.fonts['heading']),
-            ('FONTSIZE', (0, 0), (-1, 0), 12),
-            ('BOTTOMPADDING', (0, 0), (-1, 0), 8),
-            ('TOPPADDING', (0, 0), (-1, 0), 8),
-            ('VALIGN', (0, 0), (-1, -1), 'TOP'),
-        ]))
+        dos_donts_table.setStyle(GUIDANCE_TABLE_STYLE)
         
         content.append(dos_donts_table)
         content.append(Spacer(1, 0.2*inch))
@@ -945,14 +1181,7 @@ class HealthReportGenerator:
         ]
         
         sleep_dos_table = Table(sleep_dos, colWidths=[6*inch])
-        sleep_dos_table.setStyle(TableStyle([
-            ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-            ('FONTNAME', (0, 0), (-1, 0), self.fonts['heading']),
-            ('FONTSIZE', (0, 0), (-1, 0), 12),
-            ('BOTTOMPADDING', (0, 0), (-1, 0), 8),
-            ('TOPPADDING', (0, 0), (-1, 0), 8),
-            ('VALIGN', (0, 0), (-1, -1), 'TOP'),
-        ]))
+        sleep_dos_table.setStyle(GUIDANCE_TABLE_STYLE)
         
         content.append(sleep_dos_table)
         content.append(Spacer(1, 0.2*inch))
@@ -974,14 +1203,7 @@ class HealthReportGenerator:
         ]
         
         exercise_dos_table = Table(exercise_dos, colWidths=[6*inch])
-        exercise_dos_table.setStyle(TableStyle([
-            ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-            ('FONTNAME', (0, 0), (-1, 0), self.fonts['heading']),
-            ('FONTSIZE', (0, 0), (-1, 0), 12),
-            ('BOTTOMPADDING', (0, 0), (-1, 0), 8),
-            ('TOPPADDING', (0, 0), (-1, 0), 8),
-            ('VALIGN', (0, 0), (-1, -1), 'TOP'),
-        ]))
+        exercise_dos_table.setStyle(GUIDANCE_TABLE_STYLE)
         
         content.append(exercise_dos_table)
         content.append(Spacer(1, 0.2*inch))
@@ -1113,47 +1335,13 @@ class HealthReportGenerator:
             "Other Tests": []
         }
         
-        # Map test names to categories
-        category_mapping = {
-            "Hemoglobin": "Complete Blood Count",
-            "RBC": "Complete Blood Count",
-            "WBC": "Complete Blood Count",
-            "Platelets": "Complete Blood Count",
-            "Erythrocyte Sedimentation Rate": "Inflammatory markers",
-            "C-Reactive Protein": "Inflammatory markers",
-            "Iron": "Iron Studies",
-            "Ferritin": "Iron Studies",
-            "Transferrin": "Iron Studies",
-            "Glucose": "Diabetes Profile",
-            "HbA1c": "Diabetes Profile",
-            "Creatinine": "Kidney Function Test",
-            "BUN": "Kidney Function Test",
-            "eGFR": "Kidney Function Test",
-            "Sodium": "Kidney Function Test",
-            "Potassium": "Kidney Function Test",
-            "Cholesterol": "Lipid Profile",
-            "Triglycerides": "Lipid Profile",
-            "HDL": "Lipid Profile",
-            "LDL": "Lipid Profile",
-            "AST": "Liver Function Test",
-            "ALT": "Liver Function Test",
-            "Bilirubin": "Liver Function Test",
-            "Alkaline Phosphatase": "Liver Function Test",
-            "Calcium": "Calcium and Bone Health",
-            "Vitamin D": "Vitamin Profile",
-            "Vitamin B12": "Vitamin Profile",
-            "TSH": "Thyroid Function Test",
-            "T3": "Thyroid Function Test",
-            "T4": "Thyroid Function Test"
-        }
-        
-        # Categorize each test
+        # Categorize each test using CATEGORY_MAPPING
         for test in structured_data:
             test_name = test.get('Test', '')
             
             # Find category based on test name
             category = "Other Tests"
-            for key, value in category_mapping.items():
+            for key, value in CATEGORY_MAPPING.items():
                 if key.lower() in test_name.lower():
                     category = value
                     break
@@ -1165,229 +1353,25 @@ class HealthReportGenerator:
 
     def _get_category_description(self, category):
         """Get description for a test category"""
-        descriptions = {
-            "Complete Blood Count": "Gives an insight into the health of blood and blood cells which are essential to carry out various bodily functions like transporting oxygen, fighting infections, and clotting blood after an injury.",
-            "Inflammatory markers": "Helps to understand presence of an inflammation in the body. Inflammation is bodies defence against infection or injury.",
-            "Iron Studies": "Iron is a vital mineral. It helps our blood cells to transport oxygen. Iron studies are used to assess level of iron in blood and blood's ability to attach itself to iron.",
-            "Diabetes Profile": "Measures the level of glucose in the body and helps identify the body's ability to process glucose. It can be used for screnning as well as monitoring the treatment of diabetes.",
-            "Kidney Function Test": "Performed to determine how well the kidneys are working. Kidneys regulate elimination of waste from our body and maintain electrolyte balance.",
-            "Lipid Profile": "Measures the amount of Cholesterol and Triglycerides in your blood. This gives an insight into the health of heart and blood vessels.",
-            "Liver Function Test": "Group of blood tests commonly performed to evaluate the function of the liver which is essential to digest food and removing toxins from the body.",
-            "Urine Routine & Microscopy": "Microscopic examination of urine sample to check for the presence of blood cells, crystals, bacteria, parasites, and cells from tumors in it.",
-            "Calcium and Bone Health": "Measures the levels of calcium and vitamin D in the blood which are responsible for keeping bones, teeth, and muscles healthy.",
-            "Vitamin Profile": "Vitamins are the essential nutrients for human life. This profile offers tests to check level of different types of vitamin B, vitamin D, vitamin E and vitamin K.",
-            "Thyroid Function Test": "Window to the health of the butterfly shaped gland - Thyroid, which detemines how the body uses energy.",
-            "Other Tests": "Additional laboratory tests that provide valuable information about your health status."
-        }
-        
-        return descriptions.get(category, "")
+        return CATEGORY_DESCRIPTIONS.get(category, "")
 
     def _get_generic_interpretation(self, test_name):
         """Get generic interpretation for a test"""
-        interpretations = {
-            "Glucose": "Elevated glucose levels may indicate diabetes or prediabetes. This suggests that your body is having difficulty regulating blood sugar levels.",
-            "HbA1c": "HbA1c measures your average blood sugar level over the past 2-3 months. Elevated levels indicate that your blood sugar has been consistently high, which is associated with diabetes.",
-            "Cholesterol": "Elevated total cholesterol may increase your risk of heart disease and stroke. It's important to maintain healthy cholesterol levels through diet, exercise, and sometimes medication.",
-            "HDL": "HDL is often called 'good' cholesterol. Low levels of HDL cholesterol may increase your risk of heart disease.",
-            "LDL": "LDL is often called 'bad' cholesterol. Elevated levels of LDL cholesterol may increase your risk of heart disease and stroke.",
-            "Triglycerides": "Elevated triglyceride levels may contribute to hardening of the arteries or thickening of the artery walls, which increases the risk of stroke, heart attack, and heart disease.",
-            "Hemoglobin": "Low hemoglobin levels may indicate anemia, which means you don't have enough red blood cells to carry adequate oxygen to your tissues.",
-            "Iron": "Low iron levels may lead to iron deficiency anemia. Iron is essential for producing hemoglobin, which carries oxygen in your blood.",
-            "Vitamin D": "Low vitamin D levels are common and may affect bone health, immune function, and overall health. Vitamin D is produced when your skin is exposed to sunlight.",
-            "TSH": "Abnormal TSH levels may indicate a thyroid disorder. The thyroid gland produces hormones that regulate metabolism.",
-            "Creatinine": "Elevated creatinine levels may indicate kidney problems. Creatinine is a waste product that your kidneys filter from your blood."
-        }
-        
-        # Look for partial matches in test name
-        for key, value in interpretations.items():
-            if key.lower() in test_name.lower():
-                return value
+        interpretation = _match_generic_interpretation(test_name)
+        if interpretation:
+            return interpretation
         
         return "This test result is outside the reference range. Please consult with your healthcare provider for interpretation."
 
     def _get_specific_recommendations(self, test_name):
         """Get specific recommendations based on test name"""
-        recommendations = {
-            "Glucose": [
-                "Monitor your blood sugar levels regularly as recommended by your healthcare provider",
-                "Follow a balanced diet low in simple sugars and high in fiber",
-                "Engage in regular physical activity, aiming for at least 150 minutes of moderate exercise per week",
-                "Maintain a healthy weight or work toward weight loss if overweight",
-                "Take medications as prescribed by your healthcare provider"
-            ],
-            "HbA1c": [
-                "Work with your healthcare provider to develop a diabetes management plan",
-                "Monitor your blood sugar levels regularly",
-                "Follow a balanced diet with consistent carbohydrate intake throughout the day",
-                "Engage in regular physical activity",
-                "Take medications as prescribed"
-            ],
-            "Cholesterol": [
-                "Adopt a heart-healthy diet low in saturated and trans fats",
-                "Increase consumption of fruits, vegetables, whole grains, and lean proteins",
-                "Engage in regular physical activity",
-                "Maintain a healthy weight",
-                "Avoid smoking and limit alcohol consumption"
-            ],
-            "HDL": [
-                "Engage in regular aerobic exercise",
-                "Quit smoking if applicable",
-                "Maintain a healthy weight",
-                "Include healthy fats in your diet, such as olive oil, nuts, and avocados",
-                "Limit refined carbohydrates and added sugars"
-            ],
-            "LDL": [
-                "Reduce intake of saturated and trans fats",
-                "Increase consumption of soluble fiber from sources like oats, beans, and fruits",
-                "Consider plant sterols and stanols, which can help lower LDL cholesterol",
-                "Engage in regular physical activity",
-                "Take medications as prescribed by your healthcare provider"
-            ],
-            "Triglycerides": [
-                "Limit added sugars and refined carbohydrates",
-                "Reduce alcohol consumption",
-                "Choose omega-3 rich foods like fatty fish",
-                "Maintain a healthy weight",
-                "Engage in regular physical activity"
-            ],
-            "Hemoglobin": [
-                "Include iron-rich foods in your diet, such as lean meats, beans, and leafy greens",
-                "Pair iron-rich foods with vitamin C sources to enhance absorption",
-                "Avoid consuming calcium-rich foods or coffee/tea with iron-rich meals",
-                "Consider iron supplements if recommended by your healthcare provider",
-                "Follow up with your healthcare provider to monitor your hemoglobin levels"
-            ],
-            "Iron": [
-                "Include iron-rich foods in your diet",
-                "Consider iron supplements if recommended by your healthcare provider",
-                "Pair iron-rich foods with vitamin C sources to enhance absorption",
-                "Avoid consuming calcium-rich foods or coffee/tea with iron-rich meals",
-                "Follow up with your healthcare provider to monitor your iron levels"
-            ],
-            "Vitamin D": [
-                "Spend time outdoors in sunlight, but avoid sunburn",
-                "Include vitamin D-rich foods in your diet, such as fatty fish, egg yolks, and fortified foods",
-                "Consider vitamin D supplements if recommended by your healthcare provider",
-                "Follow up with your healthcare provider to monitor your vitamin D levels",
-                "Be aware that certain medications can affect vitamin D levels"
-            ],
-            "TSH": [
-                "Follow up with your healthcare provider for further evaluation",
-                "Take thyroid medications as prescribed, if applicable",
-                "Be consistent with the timing of thyroid medication",
-                "Inform your healthcare provider of all medications and supplements you are taking",
-                "Monitor for symptoms of thyroid dysfunction and report them to your healthcare provider"
-            ],
-            "Creatinine": [
-                "Stay well-hydrated",
-                "Follow a kidney-friendly diet if recommended by your healthcare provider",
-                "Monitor your blood pressure regularly",
-                "Avoid medications that can harm the kidneys, such as certain pain relievers",
-                "Follow up with your healthcare provider to monitor your kidney function"
-            ]
-        }
-        
-        # Look for partial matches in test name
-        for key, value in recommendations.items():
-            if key.lower() in test_name.lower():
-                return value
-        
-        return None
-
-    def analyze_lab_report(self, report_text):
-        """Analyze lab report text and return structured data and interpretation"""
-        try:
-            if not (self.primary_model or self.backup_model):
-                logger.error("No AI models available for analysis")
-                return None, None
-
-            interpretation_prompt = self._prepare_interpretation_prompt(report_text)
-            extraction_prompt = self._prepare_extraction_prompt(report_text)
-            
-            interpretation_response = None
-            extraction_response = None
-            
-            # Try primary model first
-            if self.primary_model:
-                try:
-                    interpretation_response = self.primary_model.generate_content(interpretation_prompt)
-                    extraction_response = self.primary_model.generate_content(extraction_prompt)
-                except Exception as e:
-                    logger.warning(f"Primary model failed: {str(e)}")
-            
-            # Fall back to backup model if primary failed or not available
-            if not (interpretation_response and extraction_response) and self.backup_model:
-                try:
-                    interpretation_response = self.backup_model.generate_content(interpretation_prompt)
-                    extraction_response = self.backup_model.generate_content(extraction_prompt)
-                except Exception as e:
-                    logger.error(f"Backup model failed: {str(e)}")
-            
-            if not (interpretation_response and extraction_response):
-                logger.error("Failed to generate responses from both models")
-                return None, None
-            
-            try:
-                structured_data = json.loads(extraction_response)
-            except json.JSONDecodeError as e:
-                logger.error(f"Failed to parse extraction response: {str(e)}")
-                return None, interpretation_response
-            
-            return structured_data, interpretation_response
-            
-        except Exception as e:
-            logger.error(f"Error analyzing lab report: {str(e)}")
-            return None, None
-
-    def display_test_results(self, df):
-        """Display test results with enhanced interactive UI"""
-        try:
-            import streamlit as st
-            st.markdown("### 🔬 Detailed Test Results")
-            
-            if 'Category' in df.columns and not df['Category'].empty:
-                categories = df['Category'].unique().tolist()
-                selected_category = st.selectbox("Filter by Category", ["All Categories"] + categories)
-                
-                filtered_df = df.copy()
-                if selected_category != "All Categories":
-                    filtered_df = filtered_df[filtered_df['Category'] == selected_category]
-                
-                for category in filtered_df['Category'].unique():
-                    with st.expander(f"📊 {category} Panel", expanded=True):
-                        category_df = filtered_df[filtered_df['Category'] == category]
-                        for _, row in category_df.iterrows():
-                            with st.container():
-                                col1, col2 = st.columns([1, 1])
-                                with col1:
-                                    st.markdown(f"### {row['Test']}")
-                                    value_color = ('🔴' if row['Status'] == 'High' else '🔵' if row['Status'] == 'Low' else '🟢')
-                                    st.markdown(f"{value_color} **Current Value:** {row['Value']}")
-                                    st.markdown(f"**Normal Range:** {row['ReferenceRange']}")
-                                with col2:
-                                    if row['Status'] != 'Normal':
-                                        severity = row.get('Severity', 'Moderate')
-                                        st.markdown(f"**Severity:** {severity}")
-                                        st.markdown("**What this means:**")
-                                        interpretation = self._get_generic_interpretation(row['Test'])
-                                        st.markdown(interpretation)
-                                        st.markdown("**Recommendations:**")
-                                        recommendations = self._get_specific_recommendations(row['Test'])
-                                        st.markdown(recommendations)
-                                    else:
-                                        st.markdown("✅ **Result is within normal range**")
-                                        st.markdown("Continue maintaining your healthy lifestyle and regular check-ups.")
-                                    st.markdown("---")
-            else:
-                st.dataframe(df, use_container_width=True)
-        except Exception as e:
-            logger.error(f"Error displaying test results: {str(e)}")
-            import streamlit as st
-            st.warning("Error displaying detailed test results. Showing basic table instead.")
-            st.dataframe(df, use_container_width=True)
+        return _match_specific_recommendations(test_name)
 
     def _create_visualization_section(self, visualization_data):
         """Create visualization section with charts"""
+        # Only needed to release the figures; imported here so PDF-only use stays light
+        import matplotlib.pyplot as plt
+        
         content = []
         temp_files = []  # Keep track of temp files to close later
         
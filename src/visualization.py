@@ -1,6 +1,5 @@
 import matplotlib.pyplot as plt
 import numpy as np
-import pandas as pd
 import re
 import logging
 
@@ -11,7 +10,6 @@ class VisualizationService:
     
     def create_health_score_chart(self, score):
         """Create enhanced health score gauge chart"""
-        plt.clf()  # Clear any existing plots
         fig, ax = plt.subplots(figsize=(5, 2.5), dpi=100)
         
         # Create gradient colormap
@@ -67,8 +65,6 @@ class VisualizationService:
     
     def create_severity_chart(self, df):
         """Create enhanced severity distribution chart"""
-        plt.clf()  # Clear any existing plots
-        
         # Ensure Severity column exists
         if 'Severity' not in df.columns:
             # Add Severity based on Status
@@ -141,8 +137,6 @@ class VisualizationService:
     
     def create_category_chart(self, df):
         """Create enhanced test category distribution chart"""
-        plt.clf()  # Clear any existing plots
-        
         # Ensure required columns exist
         if 'Category' not in df.columns:
             df['Category'] = 'Other Tests'
@@ -182,12 +176,12 @@ class VisualizationService:
         abnormal_by_category = {}
         normal_by_category = {}
         
-        for category in category_counts.index:
-            category_df = df[df['Category'] == category]
-            abnormal_count = len(category_df[category_df['Status'] != 'Normal'])
-            normal_count = len(category_df) - abnormal_count
+        # Count abnormal results per category in one grouped pass
+        abnormal_counts = (df['Status'] != 'Normal').groupby(df['Category']).sum()
+        for category, total in category_counts.items():
+            abnormal_count = int(abnormal_counts.get(category, 0))
             abnormal_by_category[category] = abnormal_count
-            normal_by_category[category] = normal_count
+            normal_by_category[category] = int(total) - abnormal_count
         
         # Sort categories by abnormal count
         sorted_categories = sorted(
@@ -232,8 +226,6 @@ class VisualizationService:
     
     def create_trend_chart(self, test_name, current_value, previous_values):
         """Create enhanced trend chart for a specific test"""
-        plt.clf()  # Clear any existing plots
-        
         try:
             # Handle both string and dictionary previous values
             processed_values = []
@@ -0,0 +1,53 @@
+import io
+import sys
+import zipfile
+from pathlib import Path
+
+import pytest
+
+pytest.importorskip("fitz")
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "src"))
+
+from pdf_processor import AdvancedPDFProcessor
+
+
+DOCUMENT_XML = """<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
+<w:document xmlns:w="http://schemas.openxmlformats.org/wordprocessingml/2006/main"
+            xmlns:mc="http://schemas.openxmlformats.org/markup-compatibility/2006"
+            xmlns:wps="http://schemas.microsoft.com/office/word/2010/wordprocessingShape"
+            xmlns:v="urn:schemas-microsoft-com:vml">
+  <w:body>
+    <w:p>
+      <w:r>
+        <mc:AlternateContent>
+          <mc:Choice Requires="wps">
+            <w:drawing><wps:txbx><w:txbxContent>
+              <w:p><w:r><w:t>BOX</w:t></w:r></w:p>
+            </w:txbxContent></wps:txbx></w:drawing>
+          </mc:Choice>
+          <mc:Fallback>
+            <w:pict><v:textbox><w:txbxContent>
+              <w:p><w:r><w:t>BOX</w:t></w:r></w:p>
+            </w:txbxContent></v:textbox></w:pict>
+          </mc:Fallback>
+        </mc:AlternateContent>
+      </w:r>
+      <w:r><w:t>after</w:t></w:r>
+    </w:p>
+    <w:p><w:r><w:t>Hemoglobin</w:t><w:tab/><w:t>14.5 g/dL</w:t></w:r></w:p>
+  </w:body>
+</w:document>
+"""
+
+
+def make_docx(document_xml):
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w") as archive:
+        archive.writestr("word/document.xml", document_xml)
+    return buffer.getvalue()
+
+
+def test_extract_text_from_docx_skips_text_boxes():
+    text = AdvancedPDFProcessor().extract_text_from_docx(make_docx(DOCUMENT_XML))
+
+    assert text == "after\nHemoglobin\t14.5 g/dL"
@@ -0,0 +1,270 @@
+import json
+import os
+import sys
+import time
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "src"))
+
+import report_analyzer
+from report_analyzer import AdvancedReportAnalyzer
+
+
+REPORT_TEXT = "Glucose 95 mg/dL (70-99 mg/dL)\nHemoglobin 14.5 g/dL (13.5-17.5 g/dL)\n"
+RESPONSE = json.dumps({
+    "interpretation": "All results are within range.",
+    "tests": [{"Test": "Glucose", "Value": "95 mg/dL", "ReferenceRange": "70-99 mg/dL", "Status": "Normal"}],
+})
+
+
+class Chunk:
+    def __init__(self, text):
+        self.text = text
+
+
+class FakeModel:
+    """Streams a fixed response after raising the given errors, one per call"""
+
+    def __init__(self, response=RESPONSE, errors=()):
+        self.response = response
+        self.errors = list(errors)
+        self.calls = 0
+
+    def generate_content(self, prompt, stream=False, **kwargs):
+        self.calls += 1
+        if self.errors:
+            raise self.errors.pop(0)
+        return iter([Chunk(self.response[:10]), Chunk(self.response[10:])])
+
+
+@pytest.fixture
+def make_analyzer(monkeypatch):
+    """Build analyzers with no real API key and the given model"""
+    monkeypatch.setattr(AdvancedReportAnalyzer, "_get_api_key", lambda self: None)
+
+    def make(model=None):
+        analyzer = AdvancedReportAnalyzer()
+        analyzer.primary_model = model
+        return analyzer
+
+    return make
+
+
+@pytest.fixture
+def stream_responses(monkeypatch):
+    """Replace the retrying stream call with one that returns the queued responses"""
+    responses = []
+
+    def fake_generate_streamed(self, model, prompt, progress_callback=None, **kwargs):
+        return responses.pop(0)
+
+    monkeypatch.setattr(AdvancedReportAnalyzer, "_generate_streamed", fake_generate_streamed)
+    return responses
+
+
+@pytest.fixture
+def cache_dir(monkeypatch, tmp_path):
+    path = tmp_path / "analysis_cache"
+    monkeypatch.setenv(report_analyzer.ANALYSIS_CACHE_DIR_ENV, str(path))
+    return path
+
+
+def age_file(path, seconds):
+    mtime = time.time() - seconds
+    os.utime(path, (mtime, mtime))
+
+
+# Retries
+
+def test_generate_streamed_retries_transient_errors(make_analyzer, monkeypatch):
+    google_exceptions = pytest.importorskip("google.api_core.exceptions")
+    sleeps = []
+    monkeypatch.setattr(report_analyzer.time, "sleep", sleeps.append)
+    model = FakeModel(errors=[google_exceptions.ServiceUnavailable("overloaded")])
+    received = []
+
+    response = make_analyzer()._generate_streamed(model, "prompt", received.append)
+
+    assert response == RESPONSE
+    assert model.calls == 2
+    assert len(sleeps) == 1
+    assert received[-1] == len(RESPONSE)
+
+
+def test_generate_streamed_gives_up_after_max_retries(make_analyzer, monkeypatch):
+    google_exceptions = pytest.importorskip("google.api_core.exceptions")
+    monkeypatch.setattr(report_analyzer.time, "sleep", lambda delay: None)
+    errors = [google_exceptions.ResourceExhausted("quota")] * (report_analyzer.MAX_RETRIES + 1)
+    model = FakeModel(errors=errors)
+
+    with pytest.raises(google_exceptions.ResourceExhausted):
+        make_analyzer()._generate_streamed(model, "prompt")
+    assert model.calls == report_analyzer.MAX_RETRIES + 1
+
+
+def test_generate_streamed_does_not_retry_other_errors(make_analyzer):
+    pytest.importorskip("google.api_core.exceptions")
+    model = FakeModel(errors=[ValueError("bad request")])
+
+    with pytest.raises(ValueError):
+        make_analyzer()._generate_streamed(model, "prompt")
+    assert model.calls == 1
+
+
+# In-memory cache
+
+def test_only_successful_analyses_are_cached(make_analyzer, stream_responses):
+    analyzer = make_analyzer(FakeModel())
+    stream_responses.extend(["not json", RESPONSE])
+
+    fallback = analyzer.analyze_lab_report(REPORT_TEXT)
+    assert fallback[1] == analyzer._generate_fallback_interpretation()
+    assert analyzer.analysis_cache == {}
+
+    structured_data, interpretation = analyzer.analyze_lab_report(REPORT_TEXT)
+    assert interpretation == "All results are within range."
+    assert len(analyzer.analysis_cache) == 1
+
+    # Served from the cache; a further model call would find no queued response
+    assert analyzer.analyze_lab_report(REPORT_TEXT) == (structured_data, interpretation)
+
+
+def test_expired_memory_entries_are_not_returned(make_analyzer, stream_responses):
+    analyzer = make_analyzer(FakeModel())
+    stream_responses.extend([RESPONSE, RESPONSE])
+    analyzer.analyze_lab_report(REPORT_TEXT)
+
+    (cache_key, (_, analysis)), = analyzer.analysis_cache.items()
+    analyzer.analysis_cache[cache_key] = (time.monotonic() - analyzer.analysis_cache_ttl - 1, analysis)
+
+    assert analyzer._get_cached_analysis(REPORT_TEXT) is None
+    analyzer.analyze_lab_report(REPORT_TEXT)
+    assert stream_responses == []
+
+
+def test_memory_cache_evicts_oldest_entry(make_analyzer):
+    analyzer = make_analyzer()
+    analyzer.analysis_cache_size = 2
+
+    for key in ("a", "b", "c"):
+        analyzer._remember_analysis(key, key.upper())
+    assert list(analyzer.analysis_cache) == ["b", "c"]
+
+    # Re-inserting an entry makes it the newest
+    analyzer._remember_analysis("b", "B")
+    analyzer._remember_analysis("d", "D")
+    assert list(analyzer.analysis_cache) == ["b", "d"]
+
+
+def test_cache_key_depends_on_model(make_analyzer):
+    analyzer = make_analyzer()
+
+    primary_key = analyzer._analysis_cache_key(report_analyzer.PRIMARY_MODEL_NAME, REPORT_TEXT)
+    backup_key = analyzer._analysis_cache_key(report_analyzer.BACKUP_MODEL_NAME, REPORT_TEXT)
+
+    assert primary_key != backup_key
+
+
+# Disk cache
+
+def test_disk_cache_is_off_by_default(make_analyzer, stream_responses, monkeypatch, tmp_path):
+    monkeypatch.delenv(report_analyzer.ANALYSIS_CACHE_DIR_ENV, raising=False)
+    monkeypatch.chdir(tmp_path)
+    analyzer = make_analyzer(FakeModel())
+    stream_responses.append(RESPONSE)
+
+    analyzer.analyze_lab_report(REPORT_TEXT)
+
+    assert analyzer.analysis_cache_dir is None
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_disk_cache_survives_a_new_analyzer(make_analyzer, stream_responses, cache_dir):
+    stream_responses.append(RESPONSE)
+    expected = make_analyzer(FakeModel()).analyze_lab_report(REPORT_TEXT)
+    assert len(list(cache_dir.glob("*.json"))) == 1
+
+    analyzer = make_analyzer(FakeModel())
+    assert analyzer.analyze_lab_report(REPORT_TEXT) == expected
+    assert len(analyzer.analysis_cache) == 1
+
+
+def test_disk_hits_respect_memory_cache_size(make_analyzer, stream_responses, cache_dir):
+    stream_responses.append(RESPONSE)
+    make_analyzer(FakeModel()).analyze_lab_report(REPORT_TEXT)
+
+    analyzer = make_analyzer(FakeModel())
+    analyzer.analysis_cache_size = 1
+    analyzer._remember_analysis("other", "analysis")
+    analyzer.analyze_lab_report(REPORT_TEXT)
+
+    assert len(analyzer.analysis_cache) == 1
+    assert "other" not in analyzer.analysis_cache
+
+
+def test_expired_disk_entries_are_pruned_on_init(make_analyzer, stream_responses, cache_dir):
+    stream_responses.append(RESPONSE)
+    analyzer = make_analyzer(FakeModel())
+    analyzer.analyze_lab_report(REPORT_TEXT)
+    entry, = cache_dir.glob("*.json")
+    age_file(entry, analyzer.analysis_cache_ttl + 1)
+
+    make_analyzer()
+
+    assert not entry.exists()
+
+
+def test_expired_disk_entries_are_deleted_on_lookup(make_analyzer, stream_responses, cache_dir):
+    stream_responses.append(RESPONSE)
+    analyzer = make_analyzer(FakeModel())
+    analyzer.analyze_lab_report(REPORT_TEXT)
+    entry, = cache_dir.glob("*.json")
+    age_file(entry, analyzer.analysis_cache_ttl + 1)
+
+    assert analyzer._load_cached_analysis(entry.stem) is None
+    assert not entry.exists()
+
+
+# Prompt text limits
+
+def test_short_reports_only_have_whitespace_collapsed(make_analyzer):
+    text = "Glucose   95\tmg/dL\n\n\n \nHemoglobin 14.5 g/dL  "
+
+    assert make_analyzer()._limit_report_text(text) == "Glucose 95 mg/dL\n\nHemoglobin 14.5 g/dL"
+
+
+def test_oversized_reports_reduce_to_result_sections(make_analyzer):
+    pytest.importorskip("fitz")
+    filler = "narrative line\n" * (report_analyzer.MAX_REPORT_CHARS // 10)
+    text = (
+        "Doctor Summary For Jane\nDoctor notes here\nWellbeing Index\n"
+        + filler
+        + "Important Parameters\nGlucose 95 mg/dL\nWellness Recommendations\n"
+        + filler
+    )
+
+    assert make_analyzer()._limit_report_text(text) == "Glucose 95 mg/dL\n\nJane\nDoctor notes here"
+
+
+def test_oversized_reports_without_sections_keep_lab_value_lines(make_analyzer):
+    pytest.importorskip("fitz")
+    lines = [f"narrative line {i}" for i in range(report_analyzer.MAX_REPORT_CHARS // 10)]
+    lines[100] = "Glucose 95 mg/dL"
+
+    result = make_analyzer()._limit_report_text("\n".join(lines))
+
+    context = report_analyzer.LAB_VALUE_CONTEXT_LINES
+    assert result == "\n".join(lines[100 - context:100 + context + 1])
+
+
+def test_oversized_sections_fall_back_to_lab_value_lines(make_analyzer):
+    pytest.importorskip("fitz")
+    filler = "narrative line\n" * (report_analyzer.MAX_REPORT_CHARS // 10)
+    text = "Important Parameters\n" + filler + "Glucose 95 mg/dL\n" + filler + "Wellness Recommendations\n"
+
+    result = make_analyzer()._limit_report_text(text)
+
+    context = report_analyzer.LAB_VALUE_CONTEXT_LINES
+    assert result == "\n".join(["narrative line"] * context + ["Glucose 95 mg/dL"] + ["narrative line"] * context)
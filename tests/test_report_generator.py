@@ -0,0 +1,50 @@
+import io
+import sys
+from pathlib import Path
+
+import pytest
+
+pytest.importorskip("reportlab")
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT / "src"))
+sys.path.insert(0, str(ROOT))
+
+import main
+import report_generator
+from report_generator import HealthReportGenerator
+
+
+class FailingDocTemplate(report_generator.SimpleDocTemplate):
+    """SimpleDocTemplate that writes part of a document, then fails"""
+
+    def __init__(self, buffer, **kwargs):
+        super().__init__(buffer, **kwargs)
+        self.buffer = buffer
+
+    def build(self, content, *args, **kwargs):
+        self.buffer.write(b"%PDF-1.4 partial")
+        raise RuntimeError("build failed")
+
+
+def test_create_pdf_report_raises_when_given_a_stream(monkeypatch):
+    monkeypatch.setattr(report_generator, "SimpleDocTemplate", FailingDocTemplate)
+
+    with pytest.raises(RuntimeError, match="build failed"):
+        HealthReportGenerator().create_pdf_report({"Name": "Test"}, stream=io.BytesIO())
+
+
+def test_create_pdf_report_returns_error_pdf_without_a_stream(monkeypatch):
+    monkeypatch.setattr(report_generator, "SimpleDocTemplate", FailingDocTemplate)
+
+    pdf_content = HealthReportGenerator().create_pdf_report({"Name": "Test"})
+
+    assert isinstance(pdf_content, bytes)
+    assert pdf_content.startswith(b"%PDF")
+
+
+def test_main_removes_partial_report_on_failure(monkeypatch, tmp_path):
+    monkeypatch.setattr(sys.modules["src.report_generator"], "SimpleDocTemplate", FailingDocTemplate)
+    monkeypatch.chdir(tmp_path)
+
+    assert main.main() == 1
+    assert list(tmp_path.iterdir()) == []
@@ -0,0 +1,88 @@
+import random
+import re
+import sys
+from pathlib import Path
+
+import pytest
+
+pytest.importorskip("fitz")
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "src"))
+
+from pdf_processor import AdvancedPDFProcessor
+
+
+PROCESSOR = AdvancedPDFProcessor()
+SECTIONS = PROCESSOR.section_patterns['sections']
+HEADINGS = sorted({heading for bounds in SECTIONS.values() for heading in bounds})
+FILLER = ["Hemoglobin 14.5 g/dL", "Page 2", "", "  indented note  ", "1 Summary 3"]
+
+
+def expected_sections(text):
+    """Sections as the original per-section `Start(.*?)End` DOTALL regexes found them"""
+    sections = {}
+    for section_name, (start_heading, end_heading) in SECTIONS.items():
+        match = re.search(f"{re.escape(start_heading)}(.*?){re.escape(end_heading)}", text, re.DOTALL)
+        if match:
+            sections[section_name] = PROCESSOR._clean_section_text(match.group(1).strip())
+    return sections
+
+
+def parsed_sections(text):
+    return PROCESSOR.parse_medical_report(text)['sections']
+
+
+def test_sections_in_report_order():
+    text = "\n".join([
+        "Doctor Summary For Jane", "All values reviewed.",
+        "Wellbeing Index", "Good",
+        "Important Parameters", "Hemoglobin 14.5 g/dL",
+        "Wellness Recommendations", "Stay hydrated",
+        "References", "Source list",
+        "End of Smart Report",
+    ])
+
+    assert parsed_sections(text) == expected_sections(text)
+    assert set(parsed_sections(text)) == set(SECTIONS)
+
+
+def test_table_of_contents_headings_before_the_body():
+    # A TOC lists every heading once before the sections themselves appear
+    toc = "\n".join(f"{number} {heading} {number + 2}" for number, heading in enumerate(HEADINGS, 1))
+    body = "\n".join([
+        "Doctor Summary For Jane", "Summary text",
+        "Wellbeing Index", "Index text",
+        "Important Parameters", "Glucose 95 mg/dL",
+        "Wellness Recommendations", "Walk daily",
+        "References", "Source list",
+        "End of Smart Report",
+    ])
+    text = f"Table of contents\n{toc}\nDisclaimer\n{body}"
+
+    assert parsed_sections(text) == expected_sections(text)
+
+
+def test_repeated_and_missing_headings():
+    text = "\n".join([
+        "Important Parameters", "first",
+        "Important Parameters", "second",
+        "Wellness Recommendations", "tips",
+        "Wellness Recommendations", "more tips",
+        "References",
+    ])
+
+    assert parsed_sections(text) == expected_sections(text)
+
+
+def test_end_heading_only_before_start_heading():
+    text = "Wellbeing Index\nearly\nDoctor Summary For Jane\nno end after this"
+
+    assert parsed_sections(text) == expected_sections(text) == {}
+
+
+def test_random_heading_sequences_match_original_regexes():
+    rng = random.Random(0)
+    for _ in range(2000):
+        lines = [rng.choice(HEADINGS + FILLER) for _ in range(rng.randint(0, 12))]
+        text = rng.choice(["\n", " ", "\n\n\n"]).join(lines)
+
+        assert parsed_sections(text) == expected_sections(text), text